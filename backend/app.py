@@ -6,11 +6,91 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 from user.routes import user_bp 
 from item.routes import item_bp
+from db import items_col, users_col, start_db_call_count, db_call_count, ping, pool_stats
+import threading
+from indexes import ensure_indexes, check_query_plans
+from codec import MongoJSONProvider
+from item.search import reindex_items
+from item.snapshots import check_owner_snapshots
+from user.ratings import recompute_ratings
+from scheduler import scheduler
+import click
+import instrumentation
+
+from item.uploads import UploadRequest, MAX_REQUEST_SIZE, MB
+from werkzeug.exceptions import RequestEntityTooLarge
 
 from flask import Blueprint
 
 app = Flask(__name__)
-CORS(app)
+app.request_class = UploadRequest # per image size limit, see item/uploads.py
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_SIZE
+app.json = MongoJSONProvider(app) # ObjectId / datetime in responses, see codec.py
+CORS(app, expose_headers=["X-DB-Calls", "Server-Timing", "X-Profile-File"])
+# query timing per model method, /metrics, X-Profile: <PROFILE_TOKEN> (INSTRUMENTATION=1, see instrumentation.py)
+instrumentation.init_app(app)
+
+# in the background so a worker starts serving without waiting for Atlas
+threading.Thread(target=ensure_indexes, name="ensure-indexes", daemon=True).start()
+
+# overdue loans, recommendation rebuilds (scheduler.py). Off with SCHEDULER_ENABLED=0,
+# e.g. when an extra process only serves requests
+if os.environ.get("SCHEDULER_ENABLED", "1") == "1":
+    scheduler.start()
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """explain() every model query, exit 1 if any of them is a COLLSCAN"""
+    bad = check_query_plans()
+    if bad:
+        raise SystemExit(f"Collection scans in: {', '.join(bad)}")
+    print("All queries use an index")
+
+@app.cli.command("reindex-search")
+def reindex_search_command():
+    """Rebuild the search terms of every item (run once for items created before search indexing)"""
+    print(f"Updated {reindex_items(items_col)} items")
+
+@app.cli.command("check-owner-snapshots")
+@click.option("--repair", is_flag=True, help="Rewrite the stale snapshots too")
+def check_owner_snapshots_command(repair):
+    """Find items whose owner snapshot doesn't match the owner anymore"""
+    stale, repaired = check_owner_snapshots(users_col, items_col, repair=repair)
+    print(f"{stale} items with a stale or missing owner snapshot, {repaired} repaired")
+
+@app.cli.command("recompute-ratings")
+def recompute_ratings_command():
+    """Average / ranking score for users rated before those were stored (then run check-owner-snapshots --repair)"""
+    print(f"Updated {recompute_ratings(users_col)} users")
+
+@app.cli.command("run-job")
+@click.argument("name")
+def run_job_command(name):
+    """Run one scheduler job now (mark_overdue, refresh_recommendations)"""
+    try:
+        print(scheduler.run_job(name))
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+@app.errorhandler(RequestEntityTooLarge)
+def too_large(e):
+    if e.description == RequestEntityTooLarge.description:
+        return jsonify({"error": f"Upload is too large (at most {MAX_REQUEST_SIZE // MB} MB per request)."}), 413
+    return jsonify({"error": e.description}), 413
+
+@app.before_request
+def count_db_calls():
+    start_db_call_count()
+
+@app.after_request
+def report_db_calls(response):
+    # lets us check that a route does a constant number of queries (no N+1).
+    # Not on streamed responses (/items/user/<id>): their find / getMore run while the
+    # body is sent, after this header is gone, so the count would read 0
+    calls = db_call_count()
+    if calls is not None and not response.is_streamed:
+        response.headers["X-DB-Calls"] = str(calls)
+    return response
 
 app.register_blueprint(user_bp)
 app.register_blueprint(item_bp)
@@ -21,6 +101,23 @@ main_bp = Blueprint('main', __name__)
 def home():
     return "MongoDB + Flask API is running!"
 
+HEALTH_TIMEOUT = float(os.environ.get("HEALTH_TIMEOUT", 2.0))
+
+@main_bp.route("/healthz")
+def healthz():
+    """Readiness probe: 200 if Mongo answers a ping within HEALTH_TIMEOUT seconds, else 503.
+    Also reports how long requests waited for a pooled connection (db.PoolStats)."""
+    try:
+        ping_ms = ping(HEALTH_TIMEOUT)
+    except Exception as e:
+        return jsonify({"status": "unavailable", "error": str(e), "pool": pool_stats.stats()}), 503
+    return jsonify({"status": "ok", "ping_ms": round(ping_ms, 1), "pool": pool_stats.stats()}), 200
+
+@main_bp.route("/jobs/stats")
+def job_stats():
+    """Runs / failures / duration / last result (batch sizes + ms for mark_overdue) of every job"""
+    return jsonify(scheduler.stats())
+
 app.register_blueprint(main_bp)
 
 
@@ -0,0 +1,94 @@
+from functools import wraps
+from quart import Quart, g, jsonify, request
+from codec import MongoJSONProvider
+from db import start_db_call_count, db_call_count
+from async_db import close_async_client
+from item.async_models import AsyncItem
+from item.pagination import parse_page_args, InvalidCursorError
+from user.tokens import verify_token
+
+# Async serving mode: the read heavy routes (browse, search, activity) on an ASGI
+# server with the async Mongo driver, so a request waiting on Atlas doesn't hold
+# a worker thread. Same paths and responses as app.py, tokens from /login work in
+# both. Everything else (login, signup, uploads, writes) stays on app.py.
+#
+#   hypercorn asgi:app --bind 0.0.0.0:8001
+#
+# bench/load.py compares the two modes.
+
+app = Quart(__name__)
+app.json = MongoJSONProvider(app)
+
+
+@app.before_request
+async def count_db_calls():
+    start_db_call_count()
+
+
+@app.after_request
+async def add_headers(response):
+    calls = db_call_count()
+    if calls is not None:
+        response.headers["X-DB-Calls"] = str(calls)
+    # what flask_cors does for app.py
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Authorization, Content-Type"
+    response.headers["Access-Control-Expose-Headers"] = "X-DB-Calls"
+    return response
+
+
+@app.after_serving
+async def close_db():
+    await close_async_client()
+
+
+def login_required(view):
+    """user.tokens.login_required for async views"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        claims = verify_token(token) if scheme.lower() == "bearer" and token else None
+        if not claims:
+            return jsonify({"error": "Login required"}), 401
+        g.session = claims
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+@app.route("/items", methods=["GET"])
+@login_required
+async def get_items():
+    try:
+        limit, cursor = parse_page_args(request.args)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+    response, status_code = await AsyncItem.get_items_for_browsing(g.session["uid"], g.session["school"], limit=limit, cursor=cursor)
+    return jsonify(response), status_code
+
+
+@app.route("/search", methods=["GET"])
+@login_required
+async def get_items_for_search():
+    user_input = request.args.get("query")
+    if not user_input:
+        return jsonify({"error": "Object Name required"}), 400
+    try:
+        limit, cursor = parse_page_args(request.args, scored=True)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+    page = await AsyncItem.get_user_query(user_input, g.session["uid"], g.session["school"], limit=limit, cursor=cursor)
+    return jsonify(page), 200
+
+
+@app.route("/items/activity/<requester_id>", methods=["GET"])
+@login_required
+async def get_activity(requester_id):
+    if g.session["uid"] != requester_id:
+        return jsonify({"error": "Not allowed"}), 403
+    response, status_code = await AsyncItem.get_user_activity(requester_id)
+    return jsonify(response), status_code
+
+
+@app.route("/")
+async def home():
+    return "MongoDB + Quart (async) API is running!"
@@ -0,0 +1,28 @@
+from pymongo import AsyncMongoClient
+from db import mongo_uri, client_options, db, users_col, items_col, DBCallCounter, pool_stats
+
+# Async driver for the ASGI app (asgi.py), same database and collections as db.py.
+# pymongo's AsyncMongoClient (the official successor of motor) binds to the event
+# loop it is first used on, so it is created lazily inside the running server.
+
+_client = None
+
+
+def async_client():
+    global _client
+    if _client is None:
+        _client = AsyncMongoClient(mongo_uri(), event_listeners=[DBCallCounter(), pool_stats], **client_options())
+    return _client
+
+
+def async_collections():
+    """(users, items) async collections"""
+    async_db = async_client()[db.name]
+    return async_db[users_col.name], async_db[items_col.name]
+
+
+async def close_async_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
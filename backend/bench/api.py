@@ -0,0 +1,183 @@
+"""Latency, DB calls and memory of the main API routes on generated data.
+
+Drives /login, /items, /search, /items/activity/<id> and /items/user/<id> through
+the Flask test client (no server, no network) against an in-process Mongo
+stand-in by default, after filling it with bench/datagen.py data:
+
+    python -m bench.api --users 500 --items-per-user 5 --requests 200
+    python -m bench.api --backend local              # a local mongod instead (use an empty db)
+    python -m bench.api --json results.json          # also write the numbers to a file
+
+Compare two commits (each is checked out in a temporary git worktree and runs
+its own copy of this script with the same arguments; both need to have it):
+
+    python -m bench.api --compare HEAD~1 HEAD
+
+The stand-in has no command monitoring, DB calls are counted per collection
+call there (see db._CountedCollection). /items/user/<id> is streamed, its queries
+run after the X-DB-Calls header is sent, so it has no db calls column ("-").
+Memory is the peak traced by tracemalloc during a second, shorter pass of each route.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROUTES = ["login", "items", "search", "activity", "user_items"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def setup(backend, users, items_per_user, seed):
+    """Configure the app for the run, import it and fill the database"""
+    os.environ["MONGO_BACKEND"] = backend
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["SCHEDULER_ENABLED"] = "0"  # no background jobs while measuring
+
+    from app import app
+    from db import users_col, items_col
+    from bench.datagen import generate
+
+    started = time.perf_counter()
+    user_docs = generate(users_col, items_col, users, items_per_user, seed)
+    print(f"{users} users / {users * items_per_user} items generated in {time.perf_counter() - started:.1f}s "
+          f"({backend})", file=sys.stderr)
+    return app.test_client(), user_docs
+
+
+def make_request(route, client, user, rng):
+    """(method, path, kwargs) of one request of `route` as `user`"""
+    from bench.datagen import PASSWORD, SEARCH_QUERIES
+    from user.tokens import issue_token
+
+    if route == "login":
+        return client.post, "/login", {"json": {"email": user["email"], "password": PASSWORD}}
+    headers = {"Authorization": "Bearer " + issue_token(user)}
+    uid = str(user["_id"])
+    if route == "items":
+        return client.get, "/items", {"headers": headers}
+    if route == "search":
+        return client.get, "/search", {"headers": headers, "query_string": {"query": rng.choice(SEARCH_QUERIES)}}
+    if route == "activity":
+        return client.get, f"/items/activity/{uid}", {"headers": headers}
+    if route == "user_items":
+        return client.get, f"/items/user/{uid}", {"headers": headers}
+    raise ValueError(route)
+
+
+def measure(client, user_docs, route, requests, seed):
+    rng = random.Random(seed)
+    latencies = []
+    db_calls = []
+    errors = 0
+    for _ in range(requests):
+        method, path, kwargs = make_request(route, client, rng.choice(user_docs), rng)
+        started = time.perf_counter()
+        response = method(path, **kwargs)
+        response.get_data()  # streamed responses are produced while being read
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            errors += 1
+        if "X-DB-Calls" in response.headers:
+            db_calls.append(int(response.headers["X-DB-Calls"]))
+    return latencies, db_calls, errors
+
+
+def run(args):
+    client, user_docs = setup(args.backend, args.users, args.items_per_user, args.seed)
+    results = {}
+    for route in args.routes:
+        measure(client, user_docs, route, args.warmup, args.seed + 1)
+        latencies, db_calls, errors = measure(client, user_docs, route, args.requests, args.seed)
+
+        tracemalloc.start()
+        measure(client, user_docs, route, args.memory_requests, args.seed)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[route] = {
+            "requests": len(latencies),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "db_calls": sum(db_calls) / len(db_calls) if db_calls else None,
+            "peak_kb": peak / 1024,
+            "errors": errors,
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'route':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db calls':>9} {'peak KB':>9} {'errors':>7}")
+    for route, r in results.items():
+        calls = f"{r['db_calls']:.1f}" if r["db_calls"] is not None else "-"
+        print(f"{route:<12} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {calls:>9} "
+              f"{r['peak_kb']:>9.0f} {r['errors']:>7}")
+
+
+def compare(revs, passthrough):
+    """Run this benchmark in a worktree of each commit and print them side by side"""
+    top = subprocess.run(["git", "rev-parse", "--show-toplevel"], capture_output=True, text=True, check=True).stdout.strip()
+    here = os.path.relpath(os.getcwd(), top)  # backend/
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rev in revs:
+            tree = os.path.join(tmp, rev.replace("/", "_").replace("~", "-").replace("^", "-"))
+            subprocess.run(["git", "worktree", "add", "--detach", tree, rev], check=True, capture_output=True)
+            try:
+                out = os.path.join(tmp, "results.json")
+                subprocess.run([sys.executable, "-m", "bench.api", *passthrough, "--json", out],
+                               cwd=os.path.join(tree, here), check=True)
+                with open(out) as f:
+                    results[rev] = json.load(f)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", tree], check=True)
+
+    a, b = revs
+    print(f"\n{'route':<12} {'metric':<9} {a:>12} {b:>12} {'change':>8}")
+    for route in results[a]:
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "db_calls", "peak_kb"):
+            before, after = results[a][route][metric], results[b].get(route, {}).get(metric)
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before * 100:+.0f}%" if before else "-"
+            print(f"{route:<12} {metric:<9} {before:>12.2f} {after:>12.2f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="mongomock", choices=["mongomock", "local"])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--items-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--memory-requests", type=int, default=10, help="requests per route traced for memory")
+    parser.add_argument("--routes", nargs="+", default=ROUTES, choices=ROUTES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("REV_A", "REV_B"), help="benchmark two commits")
+    args, _ = parser.parse_known_args()
+
+    if args.compare:
+        argv = sys.argv[1:]
+        at = argv.index("--compare")
+        compare(args.compare, argv[:at] + argv[at + 3:])
+        return
+
+    results = run(args)
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Per-item JSON serialization cost of an item listing, before and after codec.py.
+
+    python -m bench.codec --items 10000 --repeat 5
+
+"before" replays what the routes used to do: the models' str() loops over
+_id/user_id/requester/return_date, the same loop again in the route, and for
+/items/user a json_util.dumps + json.loads round trip, then jsonify's
+json.dumps. "after" is the single codec.dumps pass the app uses now.
+"""
+import argparse
+import copy
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId, json_util
+from flask.json.provider import DefaultJSONProvider
+
+from codec import dumps
+
+
+def make_items(n):
+    owners = [ObjectId() for _ in range(max(1, n // 20))]
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "user_id": random.choice(owners),
+        "title": f"Calculus textbook {i}",
+        "description": "Stewart, 8th edition, a few highlights",
+        "condition": random.choice(["excellent", "gently used", "fair", "poor"]),
+        "category": "books",
+        "requester": random.choice([" ", ObjectId()]),
+        "program": "Computer Science",
+        "school": "TMU",
+        "images": [f"/uploads/{i}.webp"],
+        "return_date": now + timedelta(days=i % 60),
+        "status": "available",
+        "owner": {"username": f"user{i % 50}", "profile": {"school": "TMU", "program": "CS", "rating": 4.5}},
+    } for i in range(n)]
+
+
+def before_browse(items):
+    # model loop
+    for item in items:
+        item["_id"] = str(item["_id"])
+        item["user_id"] = str(item["user_id"])
+        if isinstance(item.get("requester"), ObjectId):
+            item["requester"] = str(item["requester"])
+    # route loop
+    for item in items:
+        item["_id"] = str(item["_id"])
+        item["user_id"] = str(item["user_id"])
+    return json.dumps({"items": items}, default=DefaultJSONProvider.default, sort_keys=True, separators=(",", ":"))
+
+
+def before_user_items(items):
+    for item in items:
+        item["_id"] = str(item["_id"])
+        item["user_id"] = str(item["user_id"])
+        if isinstance(item.get("requester"), ObjectId):
+            item["requester"] = str(item["requester"])
+    sanitized = json.loads(json_util.dumps(items))
+    return json.dumps({"items": sanitized}, default=DefaultJSONProvider.default, sort_keys=True, separators=(",", ":"))
+
+
+def after(items):
+    return dumps({"items": items})
+
+
+def measure(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        docs = copy.deepcopy(items)  # the old paths mutate their input
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    print(f"{args.items} items, best of {args.repeat}")
+    for name, fn in (("before /items", before_browse), ("before /items/user", before_user_items), ("after (codec)", after)):
+        elapsed = measure(fn, items, args.repeat)
+        print(f"{name:20} {elapsed * 1000:8.1f} ms total {elapsed / args.items * 1e6:8.2f} us/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Synthetic users and items for benchmarks, spread over the four schools.
+
+Writes straight to the configured database (MONGO_BACKEND / MONGO_URI, see db.py),
+with the same derived fields the app stores (search terms, owner snapshot, rating
+aggregates), so every route has realistic data to work on. Every user's password
+is PASSWORD. Deterministic for a given --seed.
+
+    MONGO_BACKEND=local python -m bench.datagen --users 2000 --items-per-user 5
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+# the schools User.signup accepts, and their email domains
+SCHOOLS = {
+    "TMU": "torontomu.ca",
+    "UofT": "mail.utoronto.ca",
+    "Western": "uwo.ca",
+    "York": "my.yorku.ca",
+}
+PROGRAMS = ["Computer Science", "Nursing", "Engineering", "Business", "Psychology", "Biology", "Architecture"]
+DEGREES = ["Bachelor", "Master", "PhD"]
+CONDITIONS = ["excellent", "gently used", "fair", "poor"]
+THINGS = [
+    ("Calculus textbook", "books"), ("Organic chemistry textbook", "books"), ("Graphing calculator", "electronics"),
+    ("Desk lamp", "home"), ("Mini fridge", "home"), ("Kettle", "home"), ("Bike lock", "sports"),
+    ("Lab coat", "clothing"), ("Winter jacket", "clothing"), ("Monitor", "electronics"),
+    ("HDMI cable", "electronics"), ("Drafting set", "supplies"), ("Yoga mat", "sports"), ("Camping tent", "sports"),
+]
+DETAILS = ["barely used", "a few scratches", "works great", "some highlights", "like new", "needs a clean"]
+# share of items in each status
+STATUSES = [("available", 0.70), ("unavailable", 0.15), ("overdue", 0.05), ("old", 0.10)]
+PASSWORD = "benchmark-password"
+
+# search strings that hit the generated titles (prefixes on purpose)
+SEARCH_QUERIES = ["calc", "textbook", "lamp", "fridge", "jacket", "monitor", "chem", "bike lock", "cable", "tent"]
+
+
+def generate(users_col, items_col, users=200, items_per_user=5, seed=0, batch_size=1000):
+    """Insert the users and their items. Returns the user docs (with _id)."""
+    # imported here so reading the constants above doesn't need the app's modules
+    from user.passwords import hash_password
+    from user.ratings import RATING_PRIOR_MEAN, RATING_PRIOR_WEIGHT
+    from item.owners import owner_snapshot
+    from item.search import search_fields
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_fields = hash_password(PASSWORD)  # one hash for everyone, hashing is not what's measured
+
+    user_docs = []
+    for n in range(users):
+        school = list(SCHOOLS)[n % len(SCHOOLS)]
+        rating_count = rng.randint(0, 12)
+        rating_sum = sum(rng.randint(2, 5) for _ in range(rating_count))
+        profile = {
+            "school": school,
+            "degree": rng.choice(DEGREES),
+            "program": rng.choice(PROGRAMS),
+            "#ofratings": rating_count,
+            "rating": rating_sum / rating_count if rating_count else 0,
+        }
+        if rating_count:
+            profile["rating_score"] = (RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT + rating_sum) / (RATING_PRIOR_WEIGHT + rating_count)
+        user_docs.append({
+            "username": f"user{n}",
+            "email": f"user{n}@{SCHOOLS[school]}",
+            **password_fields,
+            "possible_dates": [],
+            "profile": profile,
+            "rating_sum": rating_sum,
+            "rating_count": rating_count,
+        })
+    for start in range(0, len(user_docs), batch_size):
+        users_col.insert_many(user_docs[start:start + batch_size])
+
+    by_school = {}
+    for user in user_docs:
+        by_school.setdefault(user["profile"]["school"], []).append(user)
+
+    items = []
+    for user in user_docs:
+        classmates = by_school[user["profile"]["school"]]
+        for _ in range(items_per_user):
+            thing, category = rng.choice(THINGS)
+            status = rng.choices([s for s, _ in STATUSES], weights=[w for _, w in STATUSES])[0]
+            item = {
+                "user_id": user["_id"],
+                "title": thing,
+                "description": f"{thing}, {rng.choice(DETAILS)}",
+                "condition": rng.choice(CONDITIONS),
+                "category": category,
+                "requester": " ",
+                "program": user["profile"]["program"],
+                "school": user["profile"]["school"],
+                "images": [],
+                "image_variants": [],
+                "return_date": now + timedelta(days=rng.randint(1, 60)),
+                "status": status,
+                "owner": owner_snapshot(user),
+            }
+            if status != "available":
+                item["requester"] = rng.choice(classmates)["_id"]
+            if status == "overdue":
+                item["return_date"] = now - timedelta(days=rng.randint(1, 20))
+            item.update(search_fields(item))
+            items.append(item)
+        if len(items) >= batch_size:
+            items_col.insert_many(items)
+            items = []
+    if items:
+        items_col.insert_many(items)
+    return user_docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--items-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from db import users_col, items_col
+    users = generate(users_col, items_col, args.users, args.items_per_user, args.seed)
+    print(f"Inserted {len(users)} users and {len(users) * args.items_per_user} items, password: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Requests/sec of the sync (app.py, WSGI) and async (asgi.py, ASGI) servers.
+
+Start both against the same database, with the same number of worker processes
+so they get the same memory, e.g.
+
+    flask --app app run --port 8000 --no-reload --with-threads
+    hypercorn asgi:app --bind 127.0.0.1:8001 --workers 1
+
+then hammer the same route on each with a fixed number of concurrent clients:
+
+    python -m bench.load --email you@torontomu.ca --password ... \\
+        --url http://127.0.0.1:8000 --url http://127.0.0.1:8001 \\
+        --path /items --path "/search?query=book" --clients 64 --seconds 15
+
+Pass --pid (one per --url) to also report each server's resident memory.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def login(base, email, password):
+    request = urllib.request.Request(
+        base + "/login", data=json.dumps({"email": email, "password": password}).encode(),
+        headers={"Content-Type": "application/json"}, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def rss_mb(pid):
+    """Resident memory of a process in MB (Linux)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def run(base, path, token, clients, seconds):
+    latencies = []
+    db_calls = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    url = base + path.replace("{user_id}", token["user_id"])
+    headers = {"Authorization": "Bearer " + token["token"]}
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                    response.read()
+                    calls = response.headers.get("X-DB-Calls")
+            except (urllib.error.URLError, ConnectionError):
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                if calls is not None:
+                    db_calls.append(int(calls))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "errors": errors[0],
+        "db_calls": statistics.mean(db_calls) if db_calls else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", required=True, help="server base url (repeat to compare)")
+    parser.add_argument("--pid", action="append", type=int, help="server pid, same order as --url")
+    parser.add_argument("--path", action="append", help="route to load, {user_id} is filled in (default /items)")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    # /login only exists on the sync app, the token works on both
+    token = login(args.url[0], args.email, args.password)
+    pids = args.pid or []
+    print(f"{'server':<28} {'path':<28} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7} {'db':>5} {'rss MB':>7}")
+    for path in args.path or ["/items"]:
+        for n, base in enumerate(args.url):
+            result = run(base, path, token, args.clients, args.seconds)
+            rss = rss_mb(pids[n]) if n < len(pids) else None
+            calls = f"{result['db_calls']:.1f}" if result["db_calls"] is not None else "-"
+            memory = f"{rss:.0f}" if rss else "-"
+            print(f"{base:<28} {path:<28} {result['rps']:>8.1f} {result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms "
+                  f"{result['p99_ms']:>6.1f}ms {result['errors']:>7} {calls:>5} {memory:>7}")
+
+if __name__ == "__main__":
+    main()
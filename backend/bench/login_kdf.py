@@ -0,0 +1,77 @@
+"""Logins/sec at the current password hashing cost.
+
+Runs the same verify path as User.login (hashing pool + scrypt) from many client
+threads at once and reports throughput, latency and how many were turned away
+because the pool queue was full. No database needed.
+
+    python -m bench.login_kdf --clients 32 --seconds 10
+    python -m bench.login_kdf --n 32768 --workers 4
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, help="scrypt n (default PASSWORD_SCRYPT_N or 2**14)")
+    parser.add_argument("--r", type=int, help="scrypt r")
+    parser.add_argument("--p", type=int, help="scrypt p")
+    parser.add_argument("--workers", type=int, help="hashing pool size (PASSWORD_WORKERS)")
+    parser.add_argument("--queue", type=int, help="hashing queue size (PASSWORD_QUEUE)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent logins")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # the pool and cost are read from the environment when passwords is imported
+    for flag, env in (("n", "PASSWORD_SCRYPT_N"), ("r", "PASSWORD_SCRYPT_R"), ("p", "PASSWORD_SCRYPT_P"),
+                      ("workers", "PASSWORD_WORKERS"), ("queue", "PASSWORD_QUEUE")):
+        if getattr(args, flag) is not None:
+            os.environ[env] = str(getattr(args, flag))
+    from user import passwords
+
+    user = passwords.hash_password("correct horse battery staple")
+    latencies = []
+    busy = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = passwords.run_in_pool(passwords.verify_password, "correct horse battery staple", user)
+                assert ok
+            except passwords.HashingBusyError:
+                with lock:
+                    busy[0] += 1
+                time.sleep(0.01)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+
+    print(f"scrypt {passwords.KDF_PARAMS}, workers={passwords.PASSWORD_WORKERS}, "
+          f"queue={passwords.PASSWORD_QUEUE}, clients={args.clients}")
+    print(f"logins/sec: {len(latencies) / elapsed:.1f}  ({len(latencies)} in {elapsed:.1f}s)")
+    if latencies:
+        print(f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} "
+              f"p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f}")
+    print(f"rejected as busy: {busy[0]}")
+
+
+if __name__ == "__main__":
+    main()
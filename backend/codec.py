@@ -0,0 +1,41 @@
+import json
+from datetime import date, datetime
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+# One place that turns Mongo documents into JSON.
+# Models return raw documents (ObjectIds, datetimes, nested dicts as they come out
+# of Mongo) and they are converted while being encoded, in a single pass, both by
+# jsonify (MongoJSONProvider) and by the streaming responses.
+
+
+def default(value):
+    """json default hook: ObjectId -> hex string, datetime -> ISO 8601"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+
+_encoder = json.JSONEncoder(default=default, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps(obj):
+    """Compact JSON for a document or a list of documents"""
+    return _encoder.encode(obj)
+
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider (app.json) that understands ObjectId and datetime.
+    Skips key sorting, the frontend doesn't care about key order."""
+    sort_keys = False
+    default = staticmethod(default)
+
+    def dumps(self, obj, **kwargs):
+        # jsonify passes separators=(",", ":") outside debug mode, that's our encoder
+        if set(kwargs) <= {"separators"} and kwargs.get("separators", (",", ":")) == (",", ":"):
+            return _encoder.encode(obj)
+        kwargs.setdefault("default", default)
+        kwargs.setdefault("ensure_ascii", False)
+        return json.dumps(obj, **kwargs)
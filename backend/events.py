@@ -0,0 +1,26 @@
+import threading
+
+# Tiny in-process event bus.
+# Jobs emit what happened (e.g. "loan_overdue" with the overdue items) and
+# whatever wants to act on it (reminders, cache invalidation) subscribes,
+# so the job doesn't need to know about them.
+
+_handlers = {}
+_lock = threading.Lock()
+
+
+def subscribe(name, handler):
+    """Call handler(payload) on every emit(name, payload)"""
+    with _lock:
+        _handlers.setdefault(name, []).append(handler)
+
+
+def emit(name, payload):
+    """Run every handler of the event. A failing handler is reported, it doesn't stop the others."""
+    with _lock:
+        handlers = list(_handlers.get(name, []))
+    for handler in handlers:
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"Handler for {name} failed: {e}")
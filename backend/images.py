@@ -0,0 +1,164 @@
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from PIL import Image, ImageOps
+
+# Uploaded images.
+# Every upload is stored once, under the sha256 of its bytes:
+#   uploads/<hash>/original.<ext>
+#   uploads/<hash>/thumb.webp, card.webp, full.webp   (resized, made in the background)
+# so the same photo uploaded twice takes the space of one, and the URL of an
+# image never changes meaning (which makes it cacheable forever).
+# This module lives outside the item package so the worker processes can import
+# it without pulling in the Flask app and the db connection.
+
+UPLOAD_FOLDER = "uploads"
+
+# variant name -> longest edge in px
+VARIANTS = {"thumb": 160, "card": 480, "full": 1600}
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = int(os.environ.get("IMAGE_QUALITY", 80))
+
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+CHUNK_SIZE = 64 * 1024
+
+# <sha256>/<file> paths under UPLOAD_FOLDER, their bytes never change
+_CONTENT_ADDRESSED = re.compile(r"^([0-9a-f]{64})/([a-z]+)\.[a-z0-9]+$")
+
+_pool = None
+
+
+def _get_pool():
+    """Process pool for resizing, started on first use. spawn (not fork) so the
+    workers don't inherit the Mongo client and request threads of the app."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def image_dir(digest):
+    return os.path.join(UPLOAD_FOLDER, digest)
+
+
+def image_urls(digest, ext):
+    """What an item stores for one image"""
+    urls = {"original": f"/uploads/{digest}/original.{ext}"}
+    for name in VARIANTS:
+        urls[name] = f"/uploads/{digest}/{name}.{VARIANT_FORMAT}"
+    return urls
+
+
+def store_image(stream, ext):
+    """Save an uploaded image stream under its content hash and queue its variants.
+    Returns (digest, urls). Nothing is written if the same bytes were stored before."""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    sha = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                sha.update(chunk)
+                out.write(chunk)
+        digest = sha.hexdigest()
+        original = os.path.join(image_dir(digest), f"original.{ext}")
+        if os.path.exists(original):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(image_dir(digest), exist_ok=True)
+            os.replace(tmp_path, original)  # atomic, two identical uploads can't clash
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    queue_variants(original, digest)
+    return digest, image_urls(digest, ext)
+
+
+def queue_variants(original, digest):
+    """Resize in the process pool, the request doesn't wait for it.
+    Never fails the upload: until the variants exist the original is served instead."""
+    global _pool
+    if all(os.path.exists(variant_path(digest, name)) for name in VARIANTS):
+        return
+    try:
+        future = _get_pool().submit(render_variants, original, image_dir(digest))
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for memory), start a fresh pool next time
+        _pool = None
+        print("Image pool was broken, variants will be made on the next upload")
+        return
+    future.add_done_callback(_report_failure)
+
+
+def _report_failure(future):
+    if future.exception():
+        print(f"Image processing failed: {future.exception()}")
+
+
+def variant_path(digest, name):
+    return os.path.join(image_dir(digest), f"{name}.{VARIANT_FORMAT}")
+
+
+def render_variants(original, out_dir):
+    """Runs in a worker process: write each missing variant of one image"""
+    with Image.open(original) as img:
+        img = ImageOps.exif_transpose(img)  # phone photos are often stored sideways
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        for name, size in VARIANTS.items():
+            path = os.path.join(out_dir, f"{name}.{VARIANT_FORMAT}")
+            if os.path.exists(path):
+                continue
+            variant = img.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)  # only ever shrinks
+            fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=f".{name}-")
+            with os.fdopen(fd, "wb") as out:
+                variant.save(out, VARIANT_FORMAT.upper(), quality=VARIANT_QUALITY, method=4)
+            os.replace(tmp_path, path)
+    return out_dir
+
+
+def is_content_addressed(filename):
+    """True for <hash>/<name>.<ext> upload paths (safe to cache forever)"""
+    return _CONTENT_ADDRESSED.match(filename) is not None
+
+
+def original_path(filename):
+    """The stored original for a <hash>/<variant> path, None if there isn't one"""
+    match = _CONTENT_ADDRESSED.match(filename)
+    if not match or not os.path.isdir(image_dir(match.group(1))):
+        return None
+    for name in os.listdir(image_dir(match.group(1))):
+        if name.startswith("original."):
+            return os.path.join(image_dir(match.group(1)), name)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(path, mtime_ns, size):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_etag(path):
+    """Strong ETag from the file's content hash.
+    Originals are named after their hash already, anything else is hashed once
+    per (mtime, size) and remembered."""
+    match = _CONTENT_ADDRESSED.match(os.path.relpath(path, UPLOAD_FOLDER).replace(os.sep, "/"))
+    if match and match.group(2) == "original":
+        return match.group(1)
+    stat = os.stat(path)
+    return _hash_file(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,102 @@
+from datetime import datetime
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from db import db, users_col, items_col
+from item.search import terms_filter
+
+# Every index the app needs, per collection. Applied at startup by ensure_indexes,
+# create_indexes is a no-op for indexes that already exist so this is safe to rerun.
+# When a model gets a new query shape, add an index here AND the query to query_shapes().
+INDEXES = {
+    users_col.name: [
+        # login / signup lookups, unique so signup doesn't need to pre-check
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    items_col.name: [
+        # available items newest first (recommendation rebuilds)
+        IndexModel([("status", ASCENDING), ("_id", DESCENDING)], name="status_newest"),
+        # browse: {school, status: "available", user_id: {$ne}} newest first (+ the feed cache loads)
+        IndexModel([("school", ASCENDING), ("status", ASCENDING), ("_id", DESCENDING)], name="school_status_newest"),
+        # search: {school, status, user_id: {$ne}, $and: [{search_terms: /^term/}]} (multikey)
+        IndexModel([("school", ASCENDING), ("status", ASCENDING), ("search_terms", ASCENDING)], name="school_status_terms"),
+        # a user's own items newest first + loaned out ({user_id, status, return_date})
+        IndexModel([("user_id", ASCENDING), ("_id", DESCENDING)], name="owner_newest"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("return_date", ASCENDING)], name="owner_status_return"),
+        # active requests {requester, status} + activity {requester, status: {$in}}
+        IndexModel([("requester", ASCENDING), ("status", ASCENDING)], name="requester_status"),
+        # overdue job (scheduler.py): {status: "unavailable", return_date: {$lt: now}}
+        IndexModel([("status", ASCENDING), ("return_date", ASCENDING)], name="status_return"),
+    ],
+}
+
+
+def ensure_indexes():
+    """Create any missing index from INDEXES (idempotent)"""
+    for name, models in INDEXES.items():
+        try:
+            db[name].create_indexes(models)
+        except PyMongoError as e:
+            # e.g. duplicate emails already in the collection, or the db isn't reachable yet,
+            # don't take the app down for it
+            print(f"Could not create indexes on {name}: {e}")
+
+
+def query_shapes():
+    """One sample of every query the User / Item models send, used by check_query_plans.
+    (name, collection, filter, sort)"""
+    some_id = ObjectId()
+    now = datetime.utcnow()
+    return [
+        ("User.login", users_col, {"email": "someone@torontomu.ca"}, None),
+        ("User.signup", users_col, {"username": "someone"}, None),
+        ("User.get_user_by_id", users_col, {"_id": some_id}, None),
+        ("attach_owners", users_col, {"_id": {"$in": [some_id]}}, None),
+        ("Item.get_items_for_browsing", items_col,
+         {"status": "available", "school": "TMU", "user_id": {"$ne": some_id}, "_id": {"$lt": some_id}}, [("_id", -1)]),
+        ("load_school_feed", items_col, {"school": "TMU", "status": "available"}, [("_id", -1)]),
+        ("Item.get_user_items_cursor", items_col, {"user_id": some_id}, [("_id", -1)]),
+        ("Item.get_user_query", items_col,
+         {"status": "available", "user_id": {"$ne": some_id}, "school": "TMU",
+          **terms_filter(["textbook"])}, None), # $match stage of the search pipeline
+        ("Item.request_item", items_col, {"_id": some_id, "status": "available"}, None),
+        ("Item.get_active_requests", items_col, {"requester": some_id, "status": "unavailable"}, None),
+        ("Item.get_my_loaned_items", items_col, {"user_id": some_id, "status": "unavailable"}, None),
+        ("Item.get_user_activity", items_col,
+         {"requester": some_id, "status": {"$in": ["unavailable", "overdue", "old"]}}, None),
+        ("Item.get_dashboard", items_col, {"$or": [{"requester": some_id}, {"user_id": some_id}]}, None),
+        ("mark_overdue", items_col, {"status": "unavailable", "return_date": {"$lt": now}}, None),
+        ("Item.complete_and_rate_owner", items_col, {"_id": some_id}, None),
+        ("refresh_recommendations", items_col, {"status": "available"}, None),
+        ("refresh_owner_snapshot", items_col, {"user_id": some_id, "owner": {"$ne": {"username": "someone"}}}, None),
+    ]
+
+
+def _plan_stages(plan):
+    """All stage names in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+
+def check_query_plans():
+    """explain() every query shape and report the ones that scan the whole collection.
+    Returns the names of the offending queries (empty list = all good)."""
+    bad = []
+    for name, collection, query, sort in query_shapes():
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = set(_plan_stages(winning))
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"{status:8} {name:32} {collection.name}: {sorted(stages)}")
+        if "COLLSCAN" in stages:
+            bad.append(name)
+    return bad
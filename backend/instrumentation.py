@@ -0,0 +1,288 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from flask import g, request, Response
+from pymongo import monitoring
+
+# Opt-in request instrumentation (INSTRUMENTATION=1), off by default:
+# - every Mongo command is timed through pymongo command monitoring and tagged
+#   with the model method that sent it (Item.get_items_for_browsing, User.login, ...)
+# - handler wall time, DB time and query count per route go into histograms,
+#   served at /metrics in the Prometheus text format (with the connection pool stats)
+# - each response gets a Server-Timing header (db / app time, query count), shows up
+#   in the browser dev tools
+# - a request with "X-Profile: <PROFILE_TOKEN>" is run under cProfile (PROFILE_SAMPLE_RATE
+#   of them), the .prof file goes to PROFILE_DIR, its name in the X-Profile-File header:
+#       python -m pstats profiles/<file>.prof   (or snakeviz)
+#   No PROFILE_TOKEN = no profiling. Only the newest PROFILE_MAX_FILES files are kept.
+# - more than N_PLUS_ONE_THRESHOLD identical commands from one method in one
+#   request is printed as a possible N+1 (like the old owner lookups in browse)
+# mongomock doesn't publish command events, so there only the handler time is recorded.
+
+INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION", "0") == "1"
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = max(1, int(os.environ.get("PROFILE_MAX_FILES", 50)))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 10))
+
+# seconds
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# queries per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# methods of these classes are what a query gets tagged with
+_MODEL_CLASSES = ("Item.", "User.", "AsyncItem.")
+_APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+
+
+class Histogram:
+    """Prometheus style histogram (cumulative buckets + sum + count) per label set"""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][n] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, (counts, total, count) in series:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = "," if labels else ""
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram("http_request_duration_seconds", "Handler wall time",
+                             ("method", "route", "status"), DURATION_BUCKETS)
+request_db_duration = Histogram("http_request_db_duration_seconds", "Time spent in Mongo commands per request",
+                                ("method", "route"), DURATION_BUCKETS)
+request_db_queries = Histogram("http_request_db_queries", "Mongo commands per request",
+                               ("method", "route"), QUERY_COUNT_BUCKETS)
+command_duration = Histogram("db_command_duration_seconds", "Mongo command round trip by calling method",
+                             ("caller", "command"), DURATION_BUCKETS)
+command_failures = Counter("db_command_failures_total", "Failed Mongo commands by calling method",
+                           ("caller", "command"))
+profiles_captured = Counter("profiles_captured_total", "Requests run under cProfile", ("route",))
+
+METRICS = [request_duration, request_db_duration, request_db_queries, command_duration, command_failures,
+           profiles_captured]
+
+# (caller, command, seconds) of every command sent while handling the current request
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def calling_method():
+    """Qualified name of the Item / User method on the stack (e.g. "Item.request_item"),
+    else the innermost function of the app itself ("item.routes.browse_items"), else "other"."""
+    fallback = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_qualname.startswith(_MODEL_CLASSES):
+            return code.co_qualname
+        if fallback is None and code.co_filename.startswith(_APP_DIR) and not code.co_filename.endswith(
+                ("instrumentation.py", "db.py")):
+            module = os.path.relpath(code.co_filename, _APP_DIR)[:-3].replace(os.sep, ".")
+            fallback = f"{module}.{code.co_qualname}"
+        frame = frame.f_back
+    return fallback or "other"
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Times every command. The driver publishes succeeded / failed on the thread (or
+    task) that sent the command, so the stack still shows who sent it."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event, failed=False)
+
+    def failed(self, event):
+        self._record(event, failed=True)
+
+    def _record(self, event, failed):
+        caller = calling_method()
+        seconds = event.duration_micros / 1e6
+        command_duration.observe(seconds, caller, event.command_name)
+        if failed:
+            command_failures.inc(caller, event.command_name)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries.append((caller, event.command_name, seconds))
+
+
+def route_label():
+    # the rule, not the path, so /items/<item_id> is one series
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+_profile_lock = threading.Lock()  # cProfile can't run two profilers at once
+
+
+def _profile_requested():
+    header = request.headers.get("X-Profile")
+    return bool(PROFILE_TOKEN) and header is not None and hmac.compare_digest(header, PROFILE_TOKEN)
+
+
+def _start_profile():
+    if not _profile_requested() or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None  # another request is being profiled
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # some other profiler / debugger is active
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def _stop_profile(profiler):
+    profiler.disable()
+    _profile_lock.release()
+    g.profiler = None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = re.sub(r"[^A-Za-z0-9]+", "_", route_label()).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}-{request.method}-{route}.prof")
+    profiler.dump_stats(path)
+    profiles_captured.inc(route_label())
+    _prune_profiles()
+    return path
+
+
+def _prune_profiles():
+    # keep the newest PROFILE_MAX_FILES, the names start with a timestamp
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".prof"))
+    for name in names[:-PROFILE_MAX_FILES]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass  # another worker removed it already
+
+
+def warn_n_plus_one(queries):
+    counts = {}
+    for caller, command, _ in queries:
+        counts[caller, command] = counts.get((caller, command), 0) + 1
+    for (caller, command), count in counts.items():
+        if count > N_PLUS_ONE_THRESHOLD:
+            print(f"Possible N+1: {caller} sent {count} {command} commands on {request.method} {route_label()}")
+
+
+def before_request():
+    g.request_started = time.perf_counter()
+    _request_queries.set([])
+    g.profiler = _start_profile()
+
+
+def after_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    queries = _request_queries.get() or []
+    db_seconds = sum(seconds for _, _, seconds in queries)
+    method, route = request.method, route_label()
+
+    request_duration.observe(elapsed, method, route, str(response.status_code))
+    request_db_duration.observe(db_seconds, method, route)
+    request_db_queries.observe(len(queries), method, route)
+    response.headers["Server-Timing"] = (
+        f'db;dur={db_seconds * 1000:.1f};desc="{len(queries)} queries", app;dur={elapsed * 1000:.1f}')
+    response.headers["Timing-Allow-Origin"] = "*"  # so the frontend's origin can read Server-Timing
+    warn_n_plus_one(queries)
+
+    if g.get("profiler") is not None:
+        response.headers["X-Profile-File"] = os.path.basename(_stop_profile(g.profiler))
+    return response
+
+
+def teardown_request(exc):
+    # after_request didn't run (exception propagated), don't leave the profiler on
+    if g.get("profiler") is not None:
+        g.profiler.disable()
+        _profile_lock.release()
+        g.profiler = None
+
+
+def render_metrics():
+    from db import pool_stats
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    for key, value in pool_stats.stats().items():
+        lines.append(f"# TYPE mongo_pool_{key} gauge")
+        lines.append(f"mongo_pool_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    """Hook the instrumentation into a Flask app if INSTRUMENTATION=1. Has to run before the
+    first Mongo client is created (db.py makes it lazily, so importing app.py is early enough)."""
+    if not INSTRUMENTATION_ENABLED:
+        return False
+    monitoring.register(CommandTimer())
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+    app.add_url_rule("/metrics", "metrics", metrics)
+    return True
@@ -0,0 +1,71 @@
+import asyncio
+from bson.objectid import ObjectId
+from async_db import async_collections
+from .owners import attach_owners_async
+from .pagination import after_id, split_page
+from .search import query_terms, terms_filter, hide_search_fields
+from .ranking import search_pipeline
+
+# The read paths of Item (models.py) on the async driver, for the ASGI app (asgi.py).
+# Same queries, same response shapes. Independent queries of one request run
+# concurrently instead of one after the other.
+
+
+class AsyncItem:
+    @staticmethod
+    async def get_items_for_browsing(user_id, school, exclude_user=True, limit=None, cursor=None):
+        """Item.get_items_for_browsing, straight from Mongo (the feed cache is the sync app's)"""
+        users, items_col = async_collections()
+        try:
+            query = {"status": "available", "school": school}
+            if exclude_user:
+                query["user_id"] = {"$ne": ObjectId(user_id)}
+            found = items_col.find(after_id(query, cursor), hide_search_fields()).sort("_id", -1)
+            if limit is not None:
+                found = found.limit(limit + 1)
+            items, next_cursor = split_page(await found.to_list(), limit, lambda doc: {"id": str(doc["_id"])})
+            await attach_owners_async(users, items)
+            return {"items": items, "next_cursor": next_cursor}, 200
+        except Exception as e:
+            return {"error": f"Failed to fetch items: {str(e)}"}, 400
+
+    @staticmethod
+    async def get_user_query(user_input, user_id, school, limit=None, cursor=None):
+        """Item.get_user_query"""
+        users, items_col = async_collections()
+        terms = query_terms(user_input)
+        if not terms:
+            return {"items": [], "next_cursor": None}
+        query = {"status": "available",
+                 "user_id": {"$ne": ObjectId(user_id)},
+                 "school": school,
+                 **terms_filter(terms)}
+
+        found = await items_col.aggregate(search_pipeline(query, terms, limit, cursor))
+        items = await found.to_list()
+        await attach_owners_async(users, items)
+
+        items, next_cursor = split_page(items, limit, lambda item: {"score": item["score"], "id": str(item["_id"])})
+        for item in items:
+            item.pop("score", None)
+        return {"items": items, "next_cursor": next_cursor}
+
+    @staticmethod
+    async def get_user_activity(requester_id):
+        """Item.get_user_activity, the three statuses are fetched at the same time"""
+        _users, items_col = async_collections()
+        try:
+            requester = ObjectId(requester_id)
+
+            def by_status(status):
+                return items_col.find({"requester": requester, "status": status}, hide_search_fields()).to_list()
+
+            active, needs_rating, history = await asyncio.gather(
+                by_status("unavailable"), by_status("overdue"), by_status("old"))
+            for doc in active:
+                doc["virtual_status"] = "active"
+            for doc in needs_rating:
+                doc["virtual_status"] = "pending_review"
+            return {"active": active, "needs_rating": needs_rating, "history": history}, 200
+        except Exception as e:
+            return {"error": str(e)}, 500
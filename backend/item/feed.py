@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+from db import items_col
+from events import subscribe
+from .owners import attach_owners
+from .pagination import encode_cursor
+from .search import hide_search_fields
+
+# Browse feed cache.
+# Everyone at a school browses the same available items (minus their own), so the
+# newest FEED_MAX_ITEMS available items of each school are kept in memory, owner
+# info attached, and pages are cut from that list. The caller's own items are
+# skipped at read time, so one list serves the whole school.
+#
+#   - younger than FEED_TTL: served as is
+#   - older, or invalidated: still served (stale-while-revalidate) while ONE
+#     background refresh per school reloads it, up to FEED_STALE_TTL
+#   - missing / older than that: the first request loads it, concurrent requests
+#     for the same school wait for that load instead of sending the same query
+#
+# Item.create_item / request_item / complete_and_rate_owner emit
+# "available_items_changed" (events.py) with the school, which marks the school's
+# list stale. A requested item is also dropped from the list right away, so it
+# can't be browsed while the refresh runs. Other processes' changes show up
+# within FEED_TTL. Pages past the cached window are read from Mongo.
+
+FEED_TTL = float(os.environ.get("FEED_TTL", 30))
+FEED_STALE_TTL = float(os.environ.get("FEED_STALE_TTL", 300))
+FEED_MAX_ITEMS = int(os.environ.get("FEED_MAX_ITEMS", 500))
+# how long a request waits for another request's load before querying itself
+FEED_LOAD_WAIT = float(os.environ.get("FEED_LOAD_WAIT", 5))
+
+
+def load_school_feed(school, max_items=FEED_MAX_ITEMS):
+    """Newest available items of a school with their owner info, one query
+    (+ one owner lookup for items older than the owner snapshots)"""
+    items = list(items_col.find({"school": school, "status": "available"}, hide_search_fields())
+                 .sort("_id", -1).limit(max_items))
+    attach_owners(items)
+    return items
+
+
+def _id_key(item_id):
+    # ascending order of the feed (newest first = _id descending)
+    return -int(str(item_id), 16)
+
+
+class _Feed:
+    def __init__(self, items, complete, loaded_at):
+        self.items = items
+        self.keys = [_id_key(item["_id"]) for item in items]
+        self.complete = complete  # every available item of the school is in the list
+        self.loaded_at = loaded_at
+        self.stale = False
+
+
+class FeedCache:
+    """Per-school browse feeds with stale-while-revalidate and single-flight loading (thread safe).
+
+    Items in the feeds are shared between requests, treat them as read only.
+    """
+
+    def __init__(self, load=load_school_feed, ttl=FEED_TTL, stale_ttl=FEED_STALE_TTL,
+                 max_items=FEED_MAX_ITEMS, clock=time.monotonic):
+        self._load = load
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_items = max_items
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._feeds = {}  # school -> _Feed
+        self._loading = {}  # school -> Event set when the running load is done
+        self._generation = {}  # school -> bumped on every invalidation
+        self._removed = {}  # school -> [(generation, item _id)] requested while a load runs
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+
+    def _refresh(self, school):
+        """Load one school's feed, called by exactly one thread at a time per school"""
+        with self._lock:
+            generation = self._generation.get(school, 0)
+        try:
+            items = self._load(school, self.max_items)
+        except Exception as e:
+            with self._lock:
+                self.load_errors += 1
+            print(f"Loading the {school} feed failed: {e}")
+            return
+        finally:
+            with self._lock:
+                self.loads += 1
+        complete = len(items) < self.max_items
+        with self._lock:
+            # items requested while we were reading may still be in what we read: drop them,
+            # the removals up to `generation` were in the db before the read started
+            removed = [entry for entry in self._removed.get(school, []) if entry[0] > generation]
+            self._removed[school] = removed
+            if removed:
+                removed_ids = {item_id for _, item_id in removed}
+                items = [item for item in items if item["_id"] not in removed_ids]
+            feed = _Feed(items, complete, self._clock())
+            # changed while we were reading: keep it, but reload on the next request
+            feed.stale = self._generation.get(school, 0) != generation
+            self._feeds[school] = feed
+
+    def _refresh_in_background(self, school):
+        try:
+            self._refresh(school)
+        finally:
+            with self._lock:
+                self._loading.pop(school).set()
+
+    def get(self, school):
+        """The school's feed, or None if it couldn't be loaded"""
+        with self._lock:
+            feed = self._feeds.get(school)
+            age = self._clock() - feed.loaded_at if feed else None
+            if feed is not None and age < self.stale_ttl:
+                if not feed.stale and age < self.ttl:
+                    self.hits += 1
+                    return feed
+                self.stale_hits += 1
+                if school in self._loading:
+                    return feed  # someone is already refreshing it
+                self._loading[school] = threading.Event()
+                threading.Thread(target=self._refresh_in_background, args=(school,),
+                                 name=f"feed-{school}", daemon=True).start()
+                return feed
+
+            self.misses += 1
+            done = self._loading.get(school)
+            leader = done is None
+            if leader:
+                done = self._loading[school] = threading.Event()
+
+        if leader:
+            try:
+                self._refresh(school)
+            finally:
+                with self._lock:
+                    self._loading.pop(school).set()
+        else:
+            done.wait(FEED_LOAD_WAIT)
+        with self._lock:
+            return self._feeds.get(school)
+
+    def page(self, school, exclude_user, limit, cursor=None):
+        """(items, next_cursor) of one newest-first page of the school's feed without
+        exclude_user's items, or None when the cache can't answer (Mongo has to)"""
+        if limit is None:
+            return None
+        feed = self.get(school)
+        if feed is None:
+            return None
+        with self._lock:
+            keys, feed_items = feed.keys, feed.items  # invalidate() swaps both together
+        start = bisect_right(keys, _id_key(cursor["id"])) if cursor else 0
+        items = []
+        for item in feed_items[start:]:
+            if item["user_id"] == exclude_user:
+                continue
+            items.append(item)
+            if len(items) > limit:
+                return items[:limit], encode_cursor(id=str(items[limit - 1]["_id"]))
+        if not feed.complete:
+            return None  # the page goes past the cached window
+        return items, None
+
+    def invalidate(self, school, removed=None):
+        """The school's available items changed: reload its feed (in the background)
+        and drop `removed` (an item _id) from it right away"""
+        with self._lock:
+            generation = self._generation[school] = self._generation.get(school, 0) + 1
+            if removed is not None and school in self._loading:
+                # for the load that is already running (see _refresh)
+                self._removed.setdefault(school, []).append((generation, removed))
+            feed = self._feeds.get(school)
+            if feed is None:
+                return
+            feed.stale = True
+            if removed is not None:
+                at = bisect_right(feed.keys, _id_key(removed)) - 1
+                if at >= 0 and feed.items[at]["_id"] == removed:
+                    # copy on write, requests may be reading the old lists
+                    feed.items = feed.items[:at] + feed.items[at + 1:]
+                    feed.keys = feed.keys[:at] + feed.keys[at + 1:]
+
+    def clear(self):
+        with self._lock:
+            self._feeds.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "schools": {school: {"items": len(feed.items), "age": round(self._clock() - feed.loaded_at, 1),
+                                     "stale": feed.stale, "complete": feed.complete}
+                            for school, feed in self._feeds.items()},
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
+
+
+browse_feed = FeedCache()
+
+
+def _on_available_items_changed(change):
+    browse_feed.invalidate(change["school"], change.get("removed"))
+
+
+subscribe("available_items_changed", _on_available_items_changed)
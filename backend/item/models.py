@@ -1,83 +1,157 @@
 from bson.objectid import ObjectId
-from db import items_col, users_col
-from datetime import datetime
-from .Priority_Queue import PriorityQueue
+import os
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from db import items_col, users_col, run_transaction
+from .owners import attach_owners, owner_snapshot
+from .snapshots import refresh_owner_snapshot
+from user.cache import invalidate_user, get_public_user, PUBLIC_USER_PROJECTION
+from user.ratings import add_rating
+from .pagination import find_page, page_cursor, split_page, encode_cursor
+from .streaming import BATCH_SIZE
+from .search import search_fields, query_terms, terms_filter, hide_search_fields, SEARCH_FIELDS
+from .ranking import search_pipeline
+from .recommend import recommendations, ensure_recommendations
+from .feed import browse_feed
+from events import emit
+
+#list of items that are similar/most useful -> get_recommended (recommend.py)
+
+# items per section of the dashboard (get_dashboard)
+DASHBOARD_LIMIT = 10
+# most items per batch create / request / archive call
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 50))
+
+
+def new_item(owner, user, item_data):
+    """Item document for create_item / create_items. owner = session claims, user = their public user doc"""
+    item = {
+        "user_id": ObjectId(owner["uid"]),
+        "title": item_data.get("title"),
+        "description": item_data.get("description"),
+        "condition": item_data.get("condition"),
+        "category": item_data.get("category"),
+        "requester": " ", # no requester at creation
+        "program": owner.get("program") or "Unknown", #optional
+        "school": owner.get("school") or "Unknown",
+        "images": item_data.get("images", []),
+        "image_variants": item_data.get("image_variants", []),
+        "return_date": item_data.get("return_date"),
+        "status": "available",  # available, unavailable, overdue, old, removed
+        "owner": owner_snapshot(user)
+    }
+    item.update(search_fields(item)) # search_terms / title_terms for the search index
+    return item
+
+
+def batch_ids(item_ids):
+    """{index: ObjectId} of the valid ids of a batch, {index: error} of the others"""
+    oids, errors = {}, {}
+    for index, item_id in enumerate(item_ids):
+        if isinstance(item_id, str) and ObjectId.is_valid(item_id):
+            oids[index] = ObjectId(item_id)
+        else:
+            errors[index] = "Invalid item id"
+    return oids, errors
 
-#create method for creating a list of items that are similar/most useful
 
 class Item:
     #works
     @staticmethod
-    def create_item(user_id, item_data):
-        """Create a new item"""
-        user = users_col.find_one({"_id": ObjectId(user_id)})
-        user_program = user.get("profile", {}).get("program", "Unknown")
-        user_school = user.get("profile", {}).get("school", "Unknown")
+    def create_item(owner, item_data):
+        """Create a new item. owner = the session claims of the logged in user (uid, school, program)"""
         try:
-            item = {
-                "user_id": ObjectId(user_id),
-                "title": item_data.get("title"),
-                "description": item_data.get("description"),
-                "condition": item_data.get("condition"),
-                "category": item_data.get("category"),
-                "requester": " ", # no requester at creation
-                "program": user_program, #optional
-                "school": user_school,
-                "images": item_data.get("images", []),
-                "return_date": item_data.get("return_date"),
-                "status": "available"  # available, exchanged, removed
-            }
+            # snapshot of the owner so browse / search don't have to look them up (cached user doc)
+            user = get_public_user(owner["uid"]) or {"username": owner.get("username"), "profile": owner}
+            item = new_item(owner, user, item_data)
             result = items_col.insert_one(item)
+            # straight into the recommendation lists of this school, without the index fields
+            recommendations.add({key: value for key, value in item.items() if key not in SEARCH_FIELDS})
+            emit("available_items_changed", {"school": item["school"]}) # browse feed (feed.py)
             return {"message": "Item created successfully", "item_id": str(result.inserted_id)}, 200
         except Exception as e:
             return {"error": f"Failed to create item: {str(e)}"}, 400
+
+    @staticmethod
+    def create_items(owner, items_data):
+        """Create many items of one owner with one insert_many, the owner is looked up once.
+        items_data = the (already validated) item_data of each item.
+        Returns one {"item_id"} or {"error"} per item, in order"""
+        user = get_public_user(owner["uid"]) or {"username": owner.get("username"), "profile": owner}
+        items = [new_item(owner, user, item_data) for item_data in items_data]
+        if not items:
+            return []
+        failed = {}
+        try:
+            # unordered: one bad document doesn't stop the rest
+            items_col.insert_many(items, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Insert failed") for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            return [{"error": f"Failed to create item: {str(e)}"} for _ in items]
+
+        results = []
+        for index, item in enumerate(items):
+            if index in failed:
+                results.append({"error": f"Failed to create item: {failed[index]}"})
+                continue
+            recommendations.add({key: value for key, value in item.items() if key not in SEARCH_FIELDS})
+            results.append({"item_id": str(item["_id"])}) # insert_many filled in the _ids
+        if len(failed) < len(items):
+            emit("available_items_changed", {"school": items[0]["school"]})
+        return results
         
     #works
     @staticmethod
-    def get_items_for_browsing(user_id, exclude_user=True):
-        """Get items for browsing (excluding user's own items)"""
+    def get_items_for_browsing(user_id, school, exclude_user=True, limit=None, cursor=None):
+        """Get items of the user's school for browsing (excluding user's own items), newest first.
+        limit/cursor -> one keyset page, next_cursor is None on the last page.
+        Pages come from the cached school feed (feed.py), Mongo only past its window"""
         try: 
-            query = {"status": "available"} 
+            page = browse_feed.page(school, ObjectId(user_id) if exclude_user else None, limit, cursor)
+            if page is not None:
+                items, next_cursor = page
+                return {"items": items, "next_cursor": next_cursor}, 200
+            query = {"status": "available", "school": school} 
             if exclude_user: 
                 query["user_id"] = {"$ne": ObjectId(user_id)} 
-            items = list(items_col.find(query).sort("created_at", -1)) 
-            # Convert ObjectId to string and add user info 
-            for item in items: 
-                u_id = item["user_id"] # Get user info for each item 
-                item["_id"] = str(item["_id"]) 
-                item["user_id"] = str(item["user_id"]) 
-                
-                user = users_col.find_one({"_id": u_id}) 
-                if user: 
-                    item["owner"] = { 
-                        "username": user.get("username"), 
-                        "profile": user.get("profile", {}) 
-                    } 
-            return items, 200 
+            items, next_cursor = find_page(items_col, query, limit, cursor, hide_search_fields()) 
+            # owner info comes with the item (snapshot), only old items without one need a lookup 
+            attach_owners(items) 
+            # raw docs, ObjectIds / dates are converted when the response is encoded (codec.py) 
+            return {"items": items, "next_cursor": next_cursor}, 200 
         except Exception as e: 
-            return [], 400
+            return {"error": f"Failed to fetch items: {str(e)}"}, 400
 
     @staticmethod
-    def get_user_items(user_id):
-        """Get items posted by a specific user"""
+    def get_recommended(user_id, school, program, limit, cursor=None):
+        """Recommended items for a user: their school, their program first, best rated owners /
+        best condition next (see recommend.py). Served from the in-memory candidate lists.
+        cursor -> (score, _id) of the last item of the previous page"""
         try:
-            items = list(items_col.find({"user_id": ObjectId(user_id)}).sort("created_at", -1))
-            for item in items:
-                item["_id"] = str(item["_id"])
-                item["user_id"] = str(item["user_id"])
-                # Convert requester field if it exists and is an ObjectId
-                if "requester" in item and item["requester"] != " " and isinstance(item["requester"], ObjectId):
-                    item["requester"] = str(item["requester"])
-            return items, 200
+            ensure_recommendations()
+            items, scores = recommendations.page(school, program, limit, cursor, exclude_user=ObjectId(user_id))
+            next_cursor = None
+            if len(items) > limit:
+                items, scores = items[:limit], scores[:limit]
+                next_cursor = encode_cursor(score=scores[-1], id=str(items[-1]["_id"]))
+            return {"items": items, "next_cursor": next_cursor}, 200
         except Exception as e:
-            return [], 400
-        
+            return {"error": f"Failed to fetch recommendations: {str(e)}"}, 400
+
+    @staticmethod
+    def get_user_items_cursor(user_id, limit=None, cursor=None):
+        """Items posted by a specific user, newest first (paged like browsing), as a raw
+        Mongo cursor for streaming responses. Returns limit + 1 docs when there is a next page (see streaming.py)"""
+        found = page_cursor(items_col, {"user_id": ObjectId(user_id)}, limit, cursor, hide_search_fields())
+        return found.batch_size(BATCH_SIZE)
+
     @staticmethod
     def request_item(item_id, requester_id):
         #When a user likes/requests an item, mark it unavailable and set them as requester
         try:
             #1.Attempt to update the item ONLY if it is currently 'available'
-            result = items_col.update_one(
+            item = items_col.find_one_and_update(
                 {
                     "_id": ObjectId(item_id), 
                     "status": "available" # Safety check: prevents double-booking
@@ -87,45 +161,94 @@ class Item:
                         "status": "unavailable",
                         "requester": ObjectId(requester_id)
                     }
-                }
+                },
+                projection={"school": 1}
             )
 
             #2. Check if the update actually happened
-            if result.modified_count == 0:
+            if item is None:
                 #This means either the ID was wrong or status wasn't 'available'
                 return {"error": "Item is no longer available or does not exist"}, 400
 
+            recommendations.remove(ObjectId(item_id))
+            emit("available_items_changed", {"school": item.get("school"), "removed": item["_id"]})
             return {"message": "Item requested successfully. You are now the requester!"}, 200
 
         except Exception as e:
             return {"error": f"Failed to request item: {str(e)}"}, 400
         
+    @staticmethod
+    def request_items(item_ids, requester_id):
+        """request_item for many items at once: the same compare-and-set (only while
+        'available') per item, all sent in one unordered bulk_write.
+        Returns one {"item_id", "status": "requested"} or {"item_id", "error"} per id, in order.
+        An item you had already requested reports as requested (a retried batch is harmless)."""
+        oids, errors = batch_ids(item_ids)
+        requester = ObjectId(requester_id)
+        if oids:
+            ops = [UpdateOne({"_id": oid, "status": "available"},
+                              {"$set": {"status": "unavailable", "requester": requester}})
+                   for oid in oids.values()]
+            items_col.bulk_write(ops, ordered=False)
+
+        # bulk_write only returns totals, read back which items are now ours
+        found = {item["_id"]: item for item in items_col.find(
+            {"_id": {"$in": list(oids.values())}}, {"status": 1, "requester": 1, "school": 1})} if oids else {}
+        results = []
+        for index, item_id in enumerate(item_ids):
+            item = found.get(oids.get(index))
+            if index in errors:
+                results.append({"item_id": item_id, "error": errors[index]})
+            elif item and item.get("status") == "unavailable" and item.get("requester") == requester:
+                recommendations.remove(item["_id"])
+                emit("available_items_changed", {"school": item.get("school"), "removed": item["_id"]})
+                results.append({"item_id": item_id, "status": "requested"})
+            else:
+                results.append({"item_id": item_id, "error": "Item is no longer available or does not exist"})
+        return results
+
+    @staticmethod
+    def archive_items(item_ids, owner_id):
+        """Take many of the owner's items off the listings (status 'removed') in one unordered
+        bulk_write. Per item compare-and-set: only the owner, only while 'available' (not on loan).
+        Returns one {"item_id", "status": "removed"} or {"item_id", "error"} per id, in order."""
+        oids, errors = batch_ids(item_ids)
+        owner = ObjectId(owner_id)
+        if oids:
+            ops = [UpdateOne({"_id": oid, "user_id": owner, "status": "available"},
+                              {"$set": {"status": "removed"}})
+                   for oid in oids.values()]
+            items_col.bulk_write(ops, ordered=False)
+
+        found = {item["_id"]: item for item in items_col.find(
+            {"_id": {"$in": list(oids.values())}}, {"status": 1, "user_id": 1, "school": 1})} if oids else {}
+        results = []
+        for index, item_id in enumerate(item_ids):
+            item = found.get(oids.get(index))
+            if index in errors:
+                results.append({"item_id": item_id, "error": errors[index]})
+            elif not item or item.get("user_id") != owner:
+                results.append({"item_id": item_id, "error": "Item not found"})
+            elif item.get("status") == "removed":
+                recommendations.remove(item["_id"])
+                emit("available_items_changed", {"school": item.get("school"), "removed": item["_id"]})
+                results.append({"item_id": item_id, "status": "removed"})
+            else:
+                results.append({"item_id": item_id, "error": "Only available items can be archived"})
+        return results
+
     @staticmethod
     def get_active_requests(requester_id):
         try:
-            current_time = datetime.utcnow() # Get current time in UTC
-            
             # Find items where:
             # 1. Requester matches
-            # 2. return_date is greater than (after) now
+            # 2. still on loan (past return_date they are moved to "overdue" by scheduler.py)
             query = {
                 "requester": ObjectId(requester_id),
-                "return_date": {"$gt": current_time}
+                "status": "unavailable"
             }
             
-            cursor = items_col.find(query)
-            # Convert MongoDB cursor to a list and stringify ObjectIds
-            items = []
-            for doc in cursor:
-                doc["_id"] = str(doc["_id"])
-                doc["requester"] = str(doc["requester"])
-                if "user_id" in doc:
-                    doc["user_id"] = str(doc["user_id"])
-                # Format date for JSON if it exists
-                if "return_date" in doc and hasattr(doc["return_date"], "isoformat"):
-                    doc["return_date"] = doc["return_date"].isoformat()
-                items.append(doc)
-                
+            items = list(items_col.find(query, hide_search_fields()))
             return {"items": items}, 200
 
         except Exception as e:
@@ -135,35 +258,15 @@ class Item:
     @staticmethod
     def get_my_loaned_items(user_id):
         try:
-            current_time = datetime.utcnow()
-            
             # Query logic: 
             # 1. user_id matches (you are the owner)
-            # 2. status is 'unavailable' (someone has requested/borrowed it)
-            # 3. return_date is in the future
+            # 2. status is 'unavailable' (someone has requested/borrowed it, and it isn't overdue yet)
             query = {
                 "user_id": ObjectId(user_id),
-                "status": "unavailable",
-                "return_date": {"$gt": current_time}
+                "status": "unavailable"
             }
             
-            cursor = items_col.find(query)
-            items = []
-            
-            for doc in cursor:
-                # Convert ObjectIds to strings for JSON compatibility
-                doc["_id"] = str(doc["_id"])
-                doc["user_id"] = str(doc["user_id"])
-                
-                if "requester" in doc and doc["requester"]:
-                    doc["requester"] = str(doc["requester"])
-                
-                # Format date to string
-                if "return_date" in doc and hasattr(doc["return_date"], "isoformat"):
-                    doc["return_date"] = doc["return_date"].isoformat()
-                    
-                items.append(doc)
-                
+            items = list(items_col.find(query, hide_search_fields()))
             return {"items": items}, 200
 
         except Exception as e:
@@ -171,123 +274,166 @@ class Item:
     
     # search feature:
     @staticmethod
-    def get_user_query(user_input, user_id):
-        """ignore case sen + show similar results. 
-        Item priority will be based on the users profile rating and condtion
-        exclude out own user id -> "$ne"""
-
-        #"excellent", "gently used",  "fair", "poor" -> Make sure people only enter valid data terms!!
-        user = users_col.find_one({"_id": ObjectId(user_id)})
-        if not user:
-            return []
-        school = user.get("profile", {}).get("school")
-        query={"title": {"$regex":user_input,
-                          "$options": "i"},
-                          "status": "available",
-                          "user_id":{"$ne": ObjectId(user_id)},
-                          "school": school}
+    def get_user_query(user_input, user_id, school, limit=None, cursor=None):
+        """ignore case sen + show similar results (stemmed, prefix matched on title/description/category). 
+        Item priority will be based on text relevance, the users profile rating and condtion (see ranking.py)
+        exclude out own user id -> "$ne
+        school -> the searcher's school (from their session)
+        limit -> only the best `limit` items come back from Mongo (ranked there, not here)
+        cursor -> (score, _id) of the last item of the previous page"""
 
-        items=list(items_col.find(query))
+        terms = query_terms(user_input)
+        if not terms:
+            return {"items": [], "next_cursor": None}
+        query={"status": "available",
+               "user_id":{"$ne": ObjectId(user_id)},
+               "school": school,
+               **terms_filter(terms)}
 
-        "cont: priority queue info"
-
-        cond_rank={"excellent":3, "gently used":2, "fair":1, "poor":0}
-        pq=PriorityQueue()
+        #one aggregation: match -> score -> keyset -> sort -> limit, equal scores newest first
+        items=list(items_col.aggregate(search_pipeline(query, terms, limit, cursor)))
+        #owner info is on the item already, looked up (in one query) only for items without a snapshot
+        attach_owners(items)
 
+        items, next_cursor = split_page(items, limit, lambda item: {"score": item["score"], "id": str(item["_id"])})
         for item in items:
-            user = users_col.find_one({"_id": item["user_id"]})
-            if user:
-                ranking_user = user.get("profile", {}).get("rating", 0)
-                # Add owner information to item
-                item["owner"] = {
-                    "username": user.get("username"),
-                    "profile": user.get("profile", {})
-                }
-            else:
-                ranking_user=0
-            
-            cond_str = item.get("condition", "fair")
-            curr_cond = cond_rank.get(cond_str, 1)
-
-            pq_score=(ranking_user *0.5) + (curr_cond*0.25)
-            
-            item["_id"] = str(item["_id"])
-            item["user_id"] = str(item["user_id"])
-
-            pq.enqueue(pq_score, item)
-
-        "now dequeue bc it has out itms known/highlighted based on highest priority"
-        
-        curr_items=[]
-        while not pq.is_empty():
-            curr_items.append(pq.dequeue())
-        return curr_items
+            item.pop("score", None)
+        return {"items": items, "next_cursor": next_cursor}
     
 
     @staticmethod
     def get_user_activity(requester_id):
-        """Categorizes items for the borrower: Active, Needs Rating (Overdue), or History."""
+        """Categorizes items for the borrower: Active, Needs Rating (Overdue), or History.
+        Loans past their return_date are already "overdue" (scheduler.py), so this is just the status."""
         try:
-            current_time = datetime.utcnow()
             # Find all items where this user is the borrower
-            query = {"requester": ObjectId(requester_id)}
-            cursor = items_col.find(query)
+            query = {"requester": ObjectId(requester_id), "status": {"$in": ["unavailable", "overdue", "old"]}}
+            cursor = items_col.find(query, hide_search_fields())
             
             active = []
             needs_rating = []
             history = []
 
             for doc in cursor:
-                doc["_id"] = str(doc["_id"])
-                doc["user_id"] = str(doc.get("user_id", ""))
-                doc["requester"] = str(doc.get("requester", ""))
-
-                # --- THE LAZY LOGIC ---
-                # Check if it's currently on loan (unavailable)
-                if doc.get("status") == "unavailable":
-                    # Check if the clock has run out
-                    if doc["return_date"] < current_time:
-                        doc["virtual_status"] = "pending_review"
-                        needs_rating.append(doc)
-                    else:
-                        doc["virtual_status"] = "active"
-                        active.append(doc)
-                
-                # Check if it was already completed/rated
-                elif doc.get("status") == "old":
+                if doc["status"] == "unavailable":
+                    doc["virtual_status"] = "active"
+                    active.append(doc)
+                elif doc["status"] == "overdue":
+                    doc["virtual_status"] = "pending_review"
+                    needs_rating.append(doc)
+                else:
                     history.append(doc)
 
-                # Format date for JSON
-                if "return_date" in doc:
-                    doc["return_date"] = doc["return_date"].isoformat()
-
             return {"active": active, "needs_rating": needs_rating, "history": history}, 200
         except Exception as e:
             return {"error": str(e)}, 500
 
     @staticmethod
-    def complete_and_rate_owner(item_id, rating_value):
-        """Archives the item and updates the owner's profile rating."""
+    def get_dashboard(user_id, limit=DASHBOARD_LIMIT):
+        """Everything the profile / matches pages show, in ONE aggregation ($facet):
+        borrowing -> active / needs_rating / history, lending -> loaned / overdue / available.
+        Each section has the count and up to `limit` items."""
         try:
-            # 1. Get the item to find out who the owner (user_id) is
-            item = items_col.find_one({"_id": ObjectId(item_id)})
-            if not item:
-                return {"error": "Item not found"}, 404
-            
-            owner_id = item.get("user_id")
+            uid = ObjectId(user_id)
+            # section -> (role field, status, sort)
+            sections = {
+                "borrowing": {
+                    "active": ("requester", "unavailable", {"return_date": 1}),
+                    "needs_rating": ("requester", "overdue", {"return_date": 1}),
+                    "history": ("requester", "old", {"_id": -1}),
+                },
+                "lending": {
+                    "loaned": ("user_id", "unavailable", {"return_date": 1}),
+                    "overdue": ("user_id", "overdue", {"return_date": 1}),
+                    "available": ("user_id", "available", {"_id": -1}),
+                },
+            }
+            facets = {}
+            for group, parts in sections.items():
+                for name, (field, status, sort) in parts.items():
+                    facets[f"{group}_{name}"] = [
+                        {"$match": {field: uid, "status": status}},
+                        {"$sort": sort},
+                        {"$limit": limit},
+                        {"$project": hide_search_fields()},
+                    ]
+            # counts of every (role, status) in the same pass
+            facets["counts"] = [{"$group": {
+                "_id": {"borrowing": {"$eq": ["$requester", uid]}, "status": "$status"},
+                "n": {"$sum": 1},
+            }}]
 
-            # 2. Update Owner Profile (Increment total stars and count)
-            users_col.update_one(
-                {"_id": ObjectId(owner_id)},
-                {"$inc": {"rating_sum": rating_value, "rating_count": 1}}
-            )
+            pipeline = [
+                # uses requester_status + owner_newest (index union for the $or)
+                {"$match": {"$or": [{"requester": uid}, {"user_id": uid}]}},
+                {"$facet": facets},
+            ]
+            result = next(items_col.aggregate(pipeline))
 
-            # 3. Change status to 'old' to hide it from active lists
-            items_col.update_one(
-                {"_id": ObjectId(item_id)},
-                {"$set": {"status": "old"}}
-            )
+            counts = {(c["_id"]["borrowing"], c["_id"]["status"]): c["n"] for c in result["counts"]}
+            dashboard = {}
+            for group, parts in sections.items():
+                dashboard[group] = {}
+                for name, (field, status, _sort) in parts.items():
+                    items = result[f"{group}_{name}"]
+                    if name == "active":
+                        for item in items:
+                            item["virtual_status"] = "active"
+                    elif name == "needs_rating":
+                        for item in items:
+                            item["virtual_status"] = "pending_review"
+                    dashboard[group][name] = {"count": counts.get((field == "requester", status), 0), "items": items}
+            return dashboard, 200
+        except Exception as e:
+            return {"error": f"Failed to fetch dashboard: {str(e)}"}, 500
+
+    @staticmethod
+    def complete_and_rate_owner(item_id, rating_value, requester_id):
+        """Archives the item and updates the owner's profile rating. Only the borrower can rate.
+        Both happen in one transaction, and only while the item isn't archived yet,
+        so a retried request can't count the same rating twice."""
+        try:
+            item_oid = ObjectId(item_id)
+            requester = ObjectId(requester_id)
+
+            def rate(session):
+                # 1. Archive the item ('old' hides it from active lists), only the first call gets past this
+                item = items_col.find_one_and_update(
+                    {"_id": item_oid, "requester": requester, "status": {"$ne": "old"}},
+                    {"$set": {"status": "old", "rating": rating_value}},
+                    projection={"user_id": 1},
+                    session=session
+                )
+                if item is None:
+                    return None
+                # 2. Add the rating to the owner, average + ranking score recomputed in the same update
+                return users_col.find_one_and_update(
+                    {"_id": item["user_id"]},
+                    add_rating(rating_value),
+                    projection=dict(PUBLIC_USER_PROJECTION),
+                    return_document=ReturnDocument.AFTER,
+                    session=session
+                )
+
+            owner = run_transaction(rate)
+
+            if owner is None:
+                # nothing changed: find out why
+                item = items_col.find_one({"_id": item_oid}, {"requester": 1, "status": 1})
+                if not item:
+                    return {"error": "Item not found"}, 404
+                if item.get("requester") != requester:
+                    return {"error": "Only the borrower can rate this item"}, 403
+                if item.get("status") == "old":
+                    return {"message": "Rating already submitted"}, 200
+                return {"error": "Item owner not found"}, 404
+
+            invalidate_user(owner["_id"])
+            # the owner's items carry a snapshot of their rating, fan the new one out
+            refresh_owner_snapshot(items_col, owner)
+            # ... and so do the cached feeds their available items are in
+            emit("available_items_changed", {"school": owner.get("profile", {}).get("school")})
 
             return {"message": "Rating submitted successfully"}, 200
         except Exception as e:
-            return {"error": str(e)}, 500
\ No newline at end of file
+            return {"error": str(e)}, 500
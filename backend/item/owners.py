@@ -0,0 +1,55 @@
+from user.cache import get_public_users, get_public_users_async
+from user.ratings import RATING_PRIOR_MEAN
+
+# Items carry a snapshot of their owner (`owner` field, written by Item.create_item
+# and refreshed by Item.complete_and_rate_owner, see snapshots.py) so browse and
+# search can be answered from items_col alone. attach_owners is the fallback for
+# items stored before snapshots existed.
+
+
+def owner_snapshot(user):
+    """The owner info kept on items (only public fields, never password_hash / salt)"""
+    profile = user.get("profile", {})
+    return {
+        "username": user.get("username"),
+        "profile": {
+            "school": profile.get("school"),
+            "program": profile.get("program"),
+            "rating": profile.get("rating", 0),
+            "rating_score": profile.get("rating_score", RATING_PRIOR_MEAN), # what search ranks by
+        },
+    }
+
+
+def attach_owners(items):
+    """Add an `owner` block to every item that has no snapshot, with at most ONE users_col query.
+
+    Collects the distinct user_ids of those items, takes what it can from the user
+    cache, fetches the rest with a single $in and joins in memory, so the number
+    of db calls doesn't grow with the number of items. Must run before user_id
+    is converted to a string.
+    """
+    missing = [item for item in items if "owner" not in item and item.get("user_id")]
+    if not missing:
+        return items
+
+    owners = get_public_users({item["user_id"] for item in missing})
+    for item in missing:
+        user = owners.get(item["user_id"])
+        if user:
+            item["owner"] = owner_snapshot(user)
+    return items
+
+
+async def attach_owners_async(async_users_col, items):
+    """attach_owners for the async app"""
+    missing = [item for item in items if "owner" not in item and item.get("user_id")]
+    if not missing:
+        return items
+
+    owners = await get_public_users_async(async_users_col, {item["user_id"] for item in missing})
+    for item in missing:
+        user = owners.get(item["user_id"])
+        if user:
+            item["owner"] = owner_snapshot(user)
+    return items
@@ -0,0 +1,93 @@
+import base64
+import json
+import math
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# Keyset (cursor) pagination helpers.
+# Listings are ordered newest first by _id (ObjectIds start with their creation
+# time), so "the next page" is just {_id < last _id seen} + sort + limit and Mongo
+# never has to skip over earlier pages.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a malformed / tampered page token or bad limit"""
+
+
+def encode_cursor(**values):
+    """Pack the sort key of the last item on a page into an opaque token"""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token, scored=False):
+    """Inverse of encode_cursor, returns the dict of sort key values.
+    Every cursor has an "id", scored ones (search / recommended) also a numeric "score";
+    anything else is a forged / truncated token -> InvalidCursorError"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, dict) or not isinstance(values.get("id"), str):
+            raise ValueError
+        values["id"] = ObjectId(values["id"])
+        if scored:
+            score = values.get("score")
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+                raise ValueError
+        return values
+    except (ValueError, TypeError, InvalidId):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def parse_page_args(args, default_limit=DEFAULT_LIMIT, scored=False):
+    """Read ?limit= and ?cursor= from request.args (scored=True: the cursor needs a score too).
+
+    Returns (limit, cursor) where cursor is the decoded dict or None.
+    limit is None only when default_limit is None and no limit was sent.
+    """
+    limit = args.get("limit", default_limit)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise InvalidCursorError("limit must be a positive integer")
+        if limit < 1:
+            raise InvalidCursorError("limit must be a positive integer")
+        limit = min(limit, MAX_LIMIT)
+
+    token = args.get("cursor")
+    cursor = decode_cursor(token, scored) if token else None
+    return limit, cursor
+
+
+def after_id(query, cursor):
+    """Add the keyset condition for the next page to a Mongo query (newest first)"""
+    if cursor:
+        query["_id"] = {"$lt": cursor["id"]}
+    return query
+
+
+def page_cursor(collection, query, limit, cursor=None, projection=None):
+    """Mongo cursor for one newest-first page of `query`, pushed down with sort + limit.
+    Asks for limit + 1 docs so we know whether there is a next page without a count."""
+    found = collection.find(after_id(query, cursor), projection).sort("_id", -1)
+    if limit is not None:
+        found = found.limit(limit + 1)
+    return found
+
+
+def find_page(collection, query, limit, cursor=None, projection=None):
+    """Run one newest-first page of `query`. Returns (docs, next_cursor)."""
+    docs = list(page_cursor(collection, query, limit, cursor, projection))
+    return split_page(docs, limit, lambda doc: {"id": str(doc["_id"])})
+
+
+def split_page(docs, limit, cursor_key):
+    """Trim a limit + 1 result to one page and build the token for the next one"""
+    if limit is None or len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(**cursor_key(docs[-1]))
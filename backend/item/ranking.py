@@ -0,0 +1,71 @@
+import json
+import os
+from user.ratings import RATING_PRIOR_MEAN
+from .search import relevance_expr, SEARCH_FIELDS
+
+# Search ranking, computed by Mongo (see search_pipeline).
+#   score = text relevance
+#         + RATING_WEIGHT * owner's rating score (Bayesian average, user/ratings.py)
+#         + CONDITION_WEIGHT * CONDITION_RANK[condition]
+# The weights and the condition ranks can be overridden from the environment,
+# e.g. SEARCH_CONDITION_RANK='{"excellent": 4, "gently used": 2, "fair": 1, "poor": 0}'
+
+RATING_WEIGHT = float(os.environ.get("SEARCH_RATING_WEIGHT", 0.5))
+CONDITION_WEIGHT = float(os.environ.get("SEARCH_CONDITION_WEIGHT", 0.25))
+
+#"excellent", "gently used",  "fair", "poor" -> Make sure people only enter valid data terms!!
+CONDITION_RANK = json.loads(os.environ.get("SEARCH_CONDITION_RANK", "null")) or {
+    "excellent": 3, "gently used": 2, "fair": 1, "poor": 0,
+}
+# missing / unknown condition counts as "fair"
+DEFAULT_CONDITION_RANK = CONDITION_RANK.get("fair", 1)
+
+
+def condition_rank(condition):
+    """CONDITION_RANK of a condition string (Python side, same rules as condition_expr)"""
+    return CONDITION_RANK.get(condition, DEFAULT_CONDITION_RANK)
+
+
+def quality_score(item):
+    """The non-text part of the search score for an item doc: owner rating + condition"""
+    owner = item.get("owner") or {}
+    rating_score = owner.get("profile", {}).get("rating_score", RATING_PRIOR_MEAN)
+    return RATING_WEIGHT * rating_score + CONDITION_WEIGHT * condition_rank(item.get("condition"))
+
+
+def condition_expr():
+    """Aggregation expression: CONDITION_RANK of the item's condition"""
+    return {"$switch": {
+        "branches": [{"case": {"$eq": ["$condition", name]}, "then": rank} for name, rank in CONDITION_RANK.items()],
+        "default": DEFAULT_CONDITION_RANK,
+    }}
+
+
+def score_expr(terms):
+    """Aggregation expression for the search score of an item.
+    The owner's rating comes from the owner snapshot on the item, no $lookup needed."""
+    return {"$add": [
+        relevance_expr(terms),
+        {"$multiply": [RATING_WEIGHT, {"$ifNull": ["$owner.profile.rating_score", RATING_PRIOR_MEAN]}]},
+        {"$multiply": [CONDITION_WEIGHT, condition_expr()]},
+    ]}
+
+
+def search_pipeline(query, terms, limit=None, cursor=None):
+    """Match, score, page and sort in Mongo, only the page itself comes back.
+    Best first, ties newest first. cursor = (score, id) of the last item of the previous page.
+    Returns limit + 1 docs when there is a next page."""
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {"score": score_expr(terms)}},
+    ]
+    if cursor:
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": cursor["score"]}},
+            {"score": cursor["score"], "_id": {"$lt": cursor["id"]}},
+        ]}})
+    pipeline.append({"$sort": {"score": -1, "_id": -1}})
+    if limit is not None:
+        pipeline.append({"$limit": limit + 1})
+    pipeline.append({"$project": dict.fromkeys(SEARCH_FIELDS, 0)})
+    return pipeline
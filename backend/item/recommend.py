@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from db import items_col
+from .ranking import quality_score
+from .search import hide_search_fields
+
+# "Recommended for you": available items of the user's school, items from their
+# own program first, then by owner rating + condition (ranking.py), newest first.
+#
+# Kept in memory per process as one ranked candidate list per (school, program):
+#   - rebuilt from items_col every RECOMMEND_REFRESH seconds (one query, scheduler.py),
+#   - updated in place when an item is created / requested in this process,
+# so serving a page is a bisect + reading `limit` entries, no query and no scoring.
+# Other processes' changes show up at the next rebuild.
+
+RECOMMEND_REFRESH = float(os.environ.get("RECOMMEND_REFRESH", 300))
+# score bonus for items posted by someone in the same program
+PROGRAM_WEIGHT = float(os.environ.get("RECOMMEND_PROGRAM_WEIGHT", 1.0))
+# longest list kept per (school, program)
+MAX_CANDIDATES = int(os.environ.get("RECOMMEND_MAX_CANDIDATES", 1000))
+
+
+def candidate_score(item, program):
+    score = quality_score(item)
+    if program and item.get("program") == program:
+        score += PROGRAM_WEIGHT
+    return score
+
+
+def _sort_key(item, program):
+    # ascending order = best score first, then newest (_id desc)
+    return (-candidate_score(item, program), -int(str(item["_id"]), 16))
+
+
+class CandidateIndex:
+    """Ranked candidate lists per (school, program), built lazily from a per-school pool (thread safe).
+
+    Items in the lists are shared between requests, treat them as read only.
+    """
+
+    def __init__(self, max_candidates=MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self._lock = threading.RLock()
+        self._pools = {}  # school -> {item _id: item}
+        self._lists = {}  # (school, program) -> (sort keys, items), best first
+        self.built_at = None
+
+    def rebuild(self, items):
+        """Replace everything with these (available) items"""
+        pools = {}
+        for item in items:
+            pools.setdefault(item.get("school"), {})[item["_id"]] = item
+        with self._lock:
+            self._pools = pools
+            self._lists = {}
+            self.built_at = time.time()
+
+    def _ranked(self, school, program):
+        ranked = self._lists.get((school, program))
+        if ranked is None:
+            # first feed for this (school, program) since the last rebuild
+            items = sorted(self._pools.get(school, {}).values(), key=lambda item: _sort_key(item, program))
+            items = items[:self.max_candidates]
+            ranked = ([_sort_key(item, program) for item in items], items)
+            self._lists[(school, program)] = ranked
+        return ranked
+
+    def add(self, item):
+        """A new available item"""
+        school = item.get("school")
+        with self._lock:
+            self._pools.setdefault(school, {})[item["_id"]] = item
+            for (list_school, program), (keys, items) in self._lists.items():
+                if list_school != school:
+                    continue
+                key = _sort_key(item, program)
+                at = bisect_left(keys, key)
+                if at >= self.max_candidates:
+                    continue
+                keys.insert(at, key)
+                items.insert(at, item)
+                if len(items) > self.max_candidates:
+                    keys.pop()
+                    items.pop()
+
+    def remove(self, item_id):
+        """An item that isn't available anymore"""
+        with self._lock:
+            for school, pool in self._pools.items():
+                item = pool.pop(item_id, None)
+                if item is not None:
+                    break
+            else:
+                return
+            for (list_school, program), (keys, items) in self._lists.items():
+                if list_school != school:
+                    continue
+                at = bisect_left(keys, _sort_key(item, program))
+                if at < len(items) and items[at]["_id"] == item_id:
+                    del keys[at]
+                    del items[at]
+
+    def page(self, school, program, limit, cursor=None, exclude_user=None):
+        """Up to limit + 1 candidates after `cursor` ({score, id} of the last one seen),
+        skipping the items of exclude_user. Returns (items, score of each)."""
+        with self._lock:
+            keys, items = self._ranked(school, program)
+            at = bisect_right(keys, (-cursor["score"], -int(str(cursor["id"]), 16))) if cursor else 0
+            found = []
+            scores = []
+            while at < len(items) and len(found) <= limit:
+                if items[at].get("user_id") != exclude_user:
+                    found.append(items[at])
+                    scores.append(-keys[at][0])
+                at += 1
+            return found, scores
+
+
+recommendations = CandidateIndex()
+_build_lock = threading.Lock()
+
+
+def refresh_recommendations():
+    """Rebuild the candidate lists from the db (one query over the available items)"""
+    recommendations.rebuild(items_col.find({"status": "available"}, hide_search_fields()))
+
+
+def ensure_recommendations():
+    """Build the lists on first use, after that the scheduler keeps rebuilding them"""
+    if recommendations.built_at is not None:
+        return
+    with _build_lock:
+        if recommendations.built_at is None:
+            refresh_recommendations()
@@ -1,78 +1,164 @@
-from datetime import datetime
 import json
-from bson import ObjectId, json_util
-from flask import Blueprint, request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
+from datetime import datetime
+from flask import Blueprint, request, jsonify, send_file, abort, g, Response, stream_with_context
+from werkzeug.security import safe_join
 import os
-from db import items_col
-import uuid
-from .models import Item
+from images import UPLOAD_FOLDER, is_content_addressed, original_path, file_etag
+from .models import Item, DASHBOARD_LIMIT, BATCH_MAX_ITEMS
+from .pagination import parse_page_args, InvalidCursorError
+from .streaming import stream_json, stream_ndjson
+from .uploads import save_images, sniff_image_type, InvalidImageError
+from .feed import browse_feed
+from user.tokens import login_required, is_current_user
 
 item_bp = Blueprint('item', __name__)
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
+# Upload folder + storage layout are in images.py
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-#works
-@item_bp.route("/items", methods=["POST"])
-def create_item():
-    user_id = request.form.get("user_id")
-    if not user_id:
-        return jsonify({"error": "User ID required"}), 400
+def item_fields(fields):
+    """(item_data, None) from the fields of a new item (form or JSON), or (None, error)"""
+    #location = fields.get("location")
+    required_fields = ["title", "description", "category", "condition", "return_date"]
     
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
-
-    title = request.form.get("title")
-    description = request.form.get("description")
-    category = request.form.get("category")
-    condition = request.form.get("condition")
-    return_date = request.form.get("return_date")
+    if not all(fields.get(field) is not None for field in required_fields):
+        return None, "Missing required fields"
 
     try:
         # This handles strings like "2026-04-12T10:00" or "2026-04-12"
-        return_date_obj = datetime.fromisoformat(return_date)
-    except ValueError:
-        return jsonify({"error": "Invalid date format. Use YYYY-MM-DDTHH:MM"}), 400
-    
-    #location = request.form.get("location")
-    user_id = request.form.get("user_id")  # send from frontend if needed
-    required_fields = ["user_id", "title", "description", "category", "condition", "return_date"]
-    
-    if not all(field in request.form for field in required_fields):
-        return jsonify({"error": "Missing required fields"}), 400
-
-    images = []
-    
+        return_date_obj = datetime.fromisoformat(fields.get("return_date"))
+    except (TypeError, ValueError):
+        return None, "Invalid date format. Use YYYY-MM-DDTHH:MM"
 
     item_data = {
-        "title": title,
-        "description": description,
-        "category": category,
-        "condition": condition,
+        "title": fields.get("title"),
+        "description": fields.get("description"),
+        "category": fields.get("category"),
+        "condition": fields.get("condition"),
         "return_date": return_date_obj,
         #"location": location,
-        "images": images
-        
+        "images": [], # original image urls
+        "image_variants": [] # {original, thumb, card, full} urls per image
     }
+    return item_data, None
+
+#works
+@item_bp.route("/items", methods=["POST"])
+@login_required
+def create_item():
+    # owner comes from the session token, not from the form
+    item_data, error = item_fields(request.form)
+    if error:
+        return jsonify({"error": error}), 400
+
     if "images" in request.files:
-        files = request.files.getlist("images")
-        for file in files:
-            filename = secure_filename(file.filename)
-            path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(path)
-            item_data["images"].append(path)  # or URL if you serve static files
-    
+        files = [file for file in request.files.getlist("images") if file.filename]
+        if not all(allowed_file(file.filename) for file in files):
+            return jsonify({"error": "Invalid file type"}), 400
+        try:
+            # all saved at once under their content hash, resized copies are made in the background
+            for urls in save_images(files):
+                item_data["images"].append(urls["original"])
+                item_data["image_variants"].append(urls)
+        except InvalidImageError as e:
+            return jsonify({"error": str(e)}), 400
+
 
-    response, status_code = Item.create_item(user_id, item_data)
+    response, status_code = Item.create_item(g.session, item_data)
     return jsonify(response), status_code
     
 
+@item_bp.route("/items/batch", methods=["POST"])
+@login_required
+def create_items():
+    """Create up to BATCH_MAX_ITEMS items in one call (clubs, residence offices...).
+    multipart: "items" = JSON list of item fields (same as POST /items), images of
+    item n under "images.<n>". Or a JSON body {"items": [...]} without images.
+    Every item is validated first, the valid ones are created together (one insert),
+    the response has one result per item, in order."""
+    try:
+        if request.is_json:
+            fields = (request.get_json(silent=True) or {}).get("items")
+        else:
+            fields = json.loads(request.form.get("items", "null"))
+    except ValueError:
+        return jsonify({"error": "items must be a JSON list"}), 400
+    if not isinstance(fields, list) or not fields:
+        return jsonify({"error": "items must be a non empty JSON list"}), 400
+    if len(fields) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400
+
+    # 1. validate everything: fields, file names and image bytes
+    results = [None] * len(fields)
+    valid = {}  # index -> (item_data, files)
+    for index, item in enumerate(fields):
+        item_data, error = item_fields(item) if isinstance(item, dict) else (None, "Item must be an object")
+        files = [file for file in request.files.getlist(f"images.{index}") if file.filename]
+        if not error and not all(allowed_file(file.filename) for file in files):
+            error = "Invalid file type"
+        if not error and any(sniff_image_type(file.stream) is None for file in files):
+            error = "Not a PNG, JPEG, GIF or WebP image"
+        if error:
+            results[index] = {"error": error}
+        else:
+            valid[index] = (item_data, files)
+
+    # 2. every image of the valid items stored at once, then handed back to its item
+    files = [file for _, item_files in valid.values() for file in item_files]
+    stored = iter(save_images(files))
+    for item_data, item_files in valid.values():
+        for urls in (next(stored) for _ in item_files):
+            item_data["images"].append(urls["original"])
+            item_data["image_variants"].append(urls)
+
+    # 3. one insert for all of them
+    created = Item.create_items(g.session, [item_data for item_data, _ in valid.values()])
+    for index, result in zip(valid, created):
+        results[index] = result
+
+    return batch_response(results, "created")
+
+
+def batch_item_ids():
+    """The "item_ids" list of a batch request / archive body, or an error response"""
+    item_ids = (request.get_json(silent=True) or {}).get("item_ids")
+    if not isinstance(item_ids, list) or not item_ids:
+        return None, (jsonify({"error": "item_ids must be a non empty list"}), 400)
+    if len(item_ids) > BATCH_MAX_ITEMS:
+        return None, (jsonify({"error": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400)
+    return item_ids, None
+
+
+def batch_response(results, done):
+    failed = sum(1 for result in results if "error" in result)
+    return jsonify({"results": results, done: len(results) - failed, "failed": failed}), 200 if failed < len(results) else 400
+
+
+@item_bp.route("/items/batch/request", methods=["POST"])
+@login_required
+def request_items():
+    """Request many items at once: {"item_ids": [...]}, one result per id (see Item.request_items)"""
+    item_ids, error = batch_item_ids()
+    if error:
+        return error
+    return batch_response(Item.request_items(item_ids, g.session["uid"]), "requested")
+
+
+@item_bp.route("/items/batch/archive", methods=["POST"])
+@login_required
+def archive_items():
+    """Take many of your available items off the listings: {"item_ids": [...]} (see Item.archive_items)"""
+    item_ids, error = batch_item_ids()
+    if error:
+        return error
+    return batch_response(Item.archive_items(item_ids, g.session["uid"]), "archived")
+
+
 @item_bp.route("/items/upload-image", methods=["POST"])
+@login_required
 def upload_image():
     """Upload an image for an item"""
     if 'image' not in request.files:
@@ -83,103 +169,140 @@ def upload_image():
         return jsonify({"error": "No image selected"}), 400
     
     if file and allowed_file(file.filename):
-        # Create uploads directory if it doesn't exist
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER)
-        
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+        # Save under the content hash (same photo twice = stored once), variants made in the background
+        try:
+            urls, = save_images([file])
+        except InvalidImageError as e:
+            return jsonify({"error": str(e)}), 400
         
-        # Save file
-        file.save(filepath)
-        
-        # Return the file URL (you might want to serve this through Flask or use a CDN)
-        image_url = f"/uploads/{unique_filename}"
-        return jsonify({"message": "Image uploaded successfully", "image_url": image_url}), 200
+        # Return the file URL + the resized versions (thumb/card/full)
+        return jsonify({"message": "Image uploaded successfully", "image_url": urls["original"], "variants": urls}), 200
     
     return jsonify({"error": "Invalid file type"}), 400
 
-@item_bp.route("/uploads/<filename>")
+# Content addressed images never change, browsers / CDNs can keep them for a year
+IMAGE_MAX_AGE = 365 * 24 * 3600
+# Old uploads are stored by their file name, which can be reused, so revalidate sooner
+LEGACY_IMAGE_MAX_AGE = 3600
+
+@item_bp.route("/uploads/<path:filename>")
 def uploaded_file(filename):
-    """Serve uploaded images"""
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    """Serve uploaded images with strong ETags, Last-Modified, 304s and byte ranges.
+    A variant that isn't rendered yet falls back to the original (not cached)."""
+    path = safe_join(UPLOAD_FOLDER, filename)
+    if path is None:
+        abort(404)
+
+    if not os.path.isfile(path):
+        original = original_path(filename)
+        if original is None:
+            abort(404)
+        response = send_file(os.path.abspath(original), etag=file_etag(original), conditional=True, max_age=0)
+        response.cache_control.no_cache = True # the real variant will show up under this url soon
+        return response
+
+    immutable = is_content_addressed(filename)
+    response = send_file(
+        os.path.abspath(path),
+        etag=file_etag(path),
+        conditional=True, # handles If-None-Match / If-Modified-Since (304) and Range (206)
+        max_age=IMAGE_MAX_AGE if immutable else LEGACY_IMAGE_MAX_AGE,
+    )
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
 
 
 #works
 #get OTHER user items
 @item_bp.route("/items", methods=["GET"])
+@login_required
 def get_items_for_browsing():
     """Get items for browsing"""
-    user_id = request.args.get("user_id")
-    if not user_id:
-        return jsonify({"error": "User ID required"}), 400
+    user_id = g.session["uid"]
     
-    items, status_code = Item.get_items_for_browsing(user_id, exclude_user=True)
-    for item in items:
-        item["_id"] = str(item["_id"])
-        item["user_id"] = str(item["user_id"])
-    return jsonify({"items": items}), status_code
+    try:
+        limit, cursor = parse_page_args(request.args)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+
+    page, status_code = Item.get_items_for_browsing(user_id, g.session["school"], exclude_user=True, limit=limit, cursor=cursor)
+    return jsonify(page), status_code
 
 #works
 
 @item_bp.route("/items/user/<user_id>", methods=["GET"])
 def get_user_items(user_id):
+    """A user's items, streamed straight from the Mongo cursor.
+    ?format=ndjson (or Accept: application/x-ndjson) for one item per line."""
     try:
-        # 1. Fetch from database using the user_id filter
-        query = {"user_id": ObjectId(user_id)}
-        items = list(items_col.find(query).sort("created_at", -1))
-        
-        # 2. json_util.dumps handles BOTH the ObjectIds AND the Datetime objects
-        # This converts return_date to a string format automatically
-        sanitized_items = json.loads(json_util.dumps(items))
+        # 1. No limit by default (profile page shows everything), ?limit=&cursor= to page
+        limit, cursor = parse_page_args(request.args, default_limit=None)
+        docs = Item.get_user_items_cursor(user_id, limit=limit, cursor=cursor)
         
-        return jsonify({"items": sanitized_items}), 200
+        # 2. Items are encoded (ObjectIds and datetimes included) and sent a batch at a time
+        if request.args.get("format") == "ndjson" or "application/x-ndjson" in request.headers.get("Accept", ""):
+            return Response(stream_with_context(stream_ndjson(docs, limit)), mimetype="application/x-ndjson")
+        return Response(stream_with_context(stream_json(docs, limit)), mimetype="application/json")
         
     except Exception as e:
         print(f"Error: {e}")
         return jsonify({"error": str(e)}), 400
 
+@item_bp.route("/items/feed/stats", methods=["GET"])
+def get_feed_stats():
+    """hit / stale / miss counters and per school age of the browse feed cache"""
+    return jsonify(browse_feed.stats()), 200
+
+@item_bp.route("/items/recommended", methods=["GET"])
+@login_required
+def get_recommended_items():
+    """Recommended for you: items of your school, your program's first (paged with ?limit= / ?cursor=)"""
+    try:
+        limit, cursor = parse_page_args(request.args, scored=True)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response, status_code = Item.get_recommended(g.session["uid"], g.session["school"], g.session.get("program"), limit, cursor)
+    return jsonify(response), status_code
+
 @item_bp.route("/search", methods=["GET"])
+@login_required
 def get_items_for_search():
     """Get items for users search"""
-    user_id = request.args.get("user_id")
+    user_id = g.session["uid"]
     user_input=request.args.get("query")
 
-    if not user_id:
-        return jsonify({"error": "User ID required"}), 401
-
     if not user_input:
         return jsonify({"error": "Object Name required"}), 400
     
     
-    items = Item.get_user_query(user_input,user_id)
-    for item in items:
-        item["_id"] = str(item["_id"])
-        item["user_id"] = str(item["user_id"])
+    try:
+        limit, cursor = parse_page_args(request.args, scored=True)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({"items": items}),200
+    page = Item.get_user_query(user_input,user_id, g.session["school"], limit=limit, cursor=cursor)
+    return jsonify(page),200
 
 @item_bp.route('/items/<item_id>/request', methods=['POST'])
+@login_required
 def handle_request_item(item_id):
-    #1. Get the requester_id from the JSON body
-    data = request.get_json()
-    
-    if not data or 'requester_id' not in data:
-        return jsonify({"error": "Missing requester_id in request body"}), 400
-    
-    requester_id = data['requester_id']
+    #1. The requester is whoever is logged in (any requester_id in the body is ignored)
+    requester_id = g.session["uid"]
 
     #2. Call your static method
-    #Note: If requester_id comes from a logged-in session, use that instead
     response, status_code = Item.request_item(item_id, requester_id)
 
     #3. Return the result
     return jsonify(response), status_code
 
 @item_bp.route('/my_requests/<requester_id>', methods=['GET'])
+@login_required
 def get_user_requests(requester_id):
+    if not is_current_user(requester_id):
+        return jsonify({"error": "Not allowed"}), 403
     # Call the static method from your class
     # Replace 'Item' with your actual class name
     response, status_code = Item.get_active_requests(requester_id)
@@ -187,6 +310,7 @@ def get_user_requests(requester_id):
     return jsonify(response), status_code
 
 @item_bp.route("/items/loaned/<user_id>", methods=["GET"])
+@login_required
 def get_loaned_items(user_id):
     """
     Returns items owned by the user that are currently 
@@ -195,6 +319,8 @@ def get_loaned_items(user_id):
     # 1. Validation: Ensure the ID is a valid 24-character hex string for MongoDB
     if len(user_id) != 24:
         return jsonify({"error": "Invalid User ID format"}), 400
+    if not is_current_user(user_id):
+        return jsonify({"error": "Not allowed"}), 403
 
     # 2. Call the static method from your Item model
     # (Assuming your class is named Item)
@@ -204,12 +330,28 @@ def get_loaned_items(user_id):
     return jsonify(response), status_code
 
 @item_bp.route("/items/activity/<requester_id>", methods=["GET"])
+@login_required
 def get_activity(requester_id):
     """Route to see what I'm borrowing and what I need to rate."""
+    if not is_current_user(requester_id):
+        return jsonify({"error": "Not allowed"}), 403
     response, status_code = Item.get_user_activity(requester_id)
     return jsonify(response), status_code
 
+@item_bp.route("/items/dashboard", methods=["GET"])
+@login_required
+def get_dashboard():
+    """Borrowing (active / needs rating / history) + lending (loaned / overdue / available)
+    of the logged in user in one call. ?limit= caps the items per section."""
+    try:
+        limit, _cursor = parse_page_args(request.args, default_limit=DASHBOARD_LIMIT)
+    except InvalidCursorError as e:
+        return jsonify({"error": str(e)}), 400
+    response, status_code = Item.get_dashboard(g.session["uid"], limit)
+    return jsonify(response), status_code
+
 @item_bp.route("/items/rate/<item_id>", methods=["POST"])
+@login_required
 def rate_owner(item_id):
     """Route to submit a rating and close the loan."""
     data = request.get_json()
@@ -218,5 +360,5 @@ def rate_owner(item_id):
     if not rating or not (1 <= rating <= 5):
         return jsonify({"error": "Valid rating (1-5) required"}), 400
 
-    response, status_code = Item.complete_and_rate_owner(item_id, rating)
+    response, status_code = Item.complete_and_rate_owner(item_id, rating, g.session["uid"])
     return jsonify(response), status_code
\ No newline at end of file
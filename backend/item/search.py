@@ -0,0 +1,114 @@
+import re
+from pymongo import UpdateOne
+
+# Search index for items.
+# Each item stores the stemmed terms of its title/description/category
+# (search_terms) and of its title alone (title_terms). A multikey index on
+# {school, status, search_terms} lets a search use anchored prefix matches on
+# those terms instead of an unanchored $regex over every title.
+# We keep our own terms instead of a Mongo $text index because $text has no
+# prefix matching ("calc" should find "calculus").
+
+# index fields, kept out of API responses
+SEARCH_FIELDS = ("search_terms", "title_terms")
+
+
+def hide_search_fields():
+    """find() projection without the index fields (a new dict each time, drivers may add to it)"""
+    return dict.fromkeys(SEARCH_FIELDS, 0)
+
+STOPWORDS = {"a", "an", "and", "the", "of", "for", "to", "in", "on", "or", "with", "my"}
+
+# relevance of one query term depending on where / how it matched
+TITLE_EXACT = 3.0
+TITLE_PREFIX = 2.0
+OTHER_EXACT = 1.0
+OTHER_PREFIX = 0.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def stem(word):
+    """Light suffix-stripping stemmer (textbooks -> textbook, running -> runn, boxes -> box).
+    Doubled consonants are kept (stuffed -> stuff, not stuf): the query "stuff" or "run" is
+    matched as a prefix, so it still finds "stuff" / "runn", while "stuf" would miss "stuff"."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    if word.endswith(("sses", "xes", "zes", "ches", "shes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """lowercase words of text, stemmed, without stopwords (keeps order and duplicates)"""
+    if not text:
+        return []
+    return [stem(word) for word in _WORD.findall(str(text).lower()) if word not in STOPWORDS]
+
+
+def search_fields(item):
+    """The fields create_item stores on an item so it can be searched"""
+    title_terms = sorted(set(tokenize(item.get("title"))))
+    other_terms = tokenize(item.get("description")) + tokenize(item.get("category"))
+    return {
+        "title_terms": title_terms,
+        "search_terms": sorted(set(title_terms) | set(other_terms)),
+    }
+
+
+def query_terms(user_input):
+    """Distinct stemmed terms of a search string (in the order typed)"""
+    return list(dict.fromkeys(tokenize(user_input)))
+
+
+def terms_filter(terms):
+    """Mongo filter matching items that have every term as a prefix of one of their terms.
+    The patterns are anchored and escaped so they use the index and can't be abused."""
+    return {"$and": [{"search_terms": re.compile("^" + re.escape(term))} for term in terms]}
+
+
+def _has_prefix(field, term):
+    # true if any element of the array `field` starts with term (anchored like terms_filter)
+    return {"$gt": [{"$size": {"$filter": {
+        "input": {"$ifNull": [field, []]},
+        "as": "t",
+        "cond": {"$regexMatch": {"input": "$$t", "regex": "^" + re.escape(term)}},
+    }}}, 0]}
+
+
+def relevance_expr(terms):
+    """Aggregation expression for the text relevance of an item (higher = better match).
+    Per term: exact title word > title word prefix > exact other word > other word prefix."""
+    per_term = []
+    for term in terms:
+        per_term.append({"$switch": {
+            "branches": [
+                {"case": {"$in": [term, {"$ifNull": ["$title_terms", []]}]}, "then": TITLE_EXACT},
+                {"case": _has_prefix("$title_terms", term), "then": TITLE_PREFIX},
+                {"case": {"$in": [term, {"$ifNull": ["$search_terms", []]}]}, "then": OTHER_EXACT},
+                {"case": _has_prefix("$search_terms", term), "then": OTHER_PREFIX},
+            ],
+            "default": 0.0,
+        }})
+    return {"$add": per_term} if per_term else 0.0
+
+
+def reindex_items(items_col, batch_size=500):
+    """(Re)build search_terms / title_terms for every item, in bulk. Returns how many were updated."""
+    updated = 0
+    ops = []
+    for item in items_col.find({}, {"title": 1, "description": 1, "category": 1}):
+        ops.append(UpdateOne({"_id": item["_id"]}, {"$set": search_fields(item)}))
+        if len(ops) >= batch_size:
+            updated += items_col.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += items_col.bulk_write(ops, ordered=False).modified_count
+    return updated
@@ -0,0 +1,47 @@
+from pymongo import UpdateMany
+from user.cache import PUBLIC_USER_PROJECTION
+from .owners import owner_snapshot
+
+# Keeping the owner snapshots on items in line with users_col.
+# Normally they are refreshed as the user changes (refresh_owner_snapshot), this
+# is the safety net: compare every user's current snapshot with what their items
+# hold and rewrite the stale ones, a batch of users per round trip.
+
+
+def refresh_owner_snapshot(items_col, user):
+    """Write the current snapshot of `user` (a user doc) to all of their items. Returns how many changed."""
+    snapshot = owner_snapshot(user)
+    result = items_col.update_many(
+        {"user_id": user["_id"], "owner": {"$ne": snapshot}},
+        {"$set": {"owner": snapshot}},
+    )
+    return result.modified_count
+
+
+def _stale_filter(user):
+    # items of this user whose snapshot is missing or differs (embedded docs compare exactly)
+    return {"user_id": user["_id"], "owner": {"$ne": owner_snapshot(user)}}
+
+
+def check_owner_snapshots(users_col, items_col, repair=False, batch_size=200):
+    """Count (and with repair=True, rewrite) items whose owner snapshot is stale or missing.
+    One items query / bulk write per `batch_size` users. Returns (stale, repaired)."""
+    stale = 0
+    repaired = 0
+    batch = []
+
+    def flush():
+        nonlocal stale, repaired
+        stale += items_col.count_documents({"$or": [_stale_filter(user) for user in batch]})
+        if repair:
+            ops = [UpdateMany(_stale_filter(user), {"$set": {"owner": owner_snapshot(user)}}) for user in batch]
+            repaired += items_col.bulk_write(ops, ordered=False).modified_count
+        batch.clear()
+
+    for user in users_col.find({}, dict(PUBLIC_USER_PROJECTION)):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return stale, repaired
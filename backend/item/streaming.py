@@ -0,0 +1,59 @@
+from codec import dumps as _encode
+from .pagination import encode_cursor
+
+# Streams a Mongo cursor to the client as it is read instead of building the
+# whole list (and then a JSON string of it) in memory first. Memory per request
+# is bounded by BATCH_SIZE docs, and the first bytes go out as soon as the
+# first batch comes back from Mongo.
+
+BATCH_SIZE = 100
+
+
+def _page(docs, limit):
+    """Yield up to `limit` docs, then the token for the next page (or None) as the last value.
+    The cursor is expected to return limit + 1 docs when there is a next page."""
+    last = None
+    for n, doc in enumerate(docs):
+        if limit is not None and n == limit:
+            yield encode_cursor(id=str(last["_id"]))
+            return
+        last = doc
+        yield doc
+    yield None
+
+
+def stream_json(docs, limit=None, batch_size=BATCH_SIZE):
+    """{"items": [...], "next_cursor": ...} written a batch of docs at a time"""
+    yield '{"items":['
+    chunk = []
+    first = True
+    next_cursor = None
+    for doc in _page(docs, limit):
+        if doc is None or isinstance(doc, str):
+            next_cursor = doc
+            break
+        chunk.append(_encode(doc) if first else "," + _encode(doc))
+        first = False
+        if len(chunk) >= batch_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+    yield '],"next_cursor":' + _encode(next_cursor) + "}"
+
+
+def stream_ndjson(docs, limit=None, batch_size=BATCH_SIZE):
+    """One doc per line, then a last {"next_cursor": ...} line"""
+    chunk = []
+    next_cursor = None
+    for doc in _page(docs, limit):
+        if doc is None or isinstance(doc, str):
+            next_cursor = doc
+            break
+        chunk.append(_encode(doc) + "\n")
+        if len(chunk) >= batch_size:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+    yield _encode({"next_cursor": next_cursor}) + "\n"
@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+from images import store_image
+
+# Upload limits + validation for image uploads.
+# The multipart body is read by werkzeug in chunks into a spooled temp file per
+# file (memory up to SPOOL_SIZE, then disk). The limits are checked while it is
+# being read, so an oversized upload is cut off at the limit with a 413 instead
+# of being written out in full first:
+#   MAX_UPLOAD_SIZE   per file
+#   MAX_REQUEST_SIZE  whole request (Flask's MAX_CONTENT_LENGTH)
+
+MB = 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_MB", 10)) * MB
+MAX_REQUEST_SIZE = int(os.environ.get("MAX_REQUEST_MB", 50)) * MB
+SPOOL_SIZE = 512 * 1024
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", 4))
+
+# first bytes of each image type we accept -> extension it is stored with
+MAGIC_NUMBERS = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+class InvalidImageError(ValueError):
+    """The uploaded bytes aren't one of the image types we accept"""
+
+
+class _LimitedSpool(SpooledTemporaryFile):
+    """Spooled temp file that refuses to grow past `limit` bytes"""
+
+    def __init__(self, limit, **kwargs):
+        super().__init__(**kwargs)
+        self._limit = limit
+        self._written = 0
+
+    def write(self, data):
+        self._written += len(data)
+        if self._written > self._limit:
+            self.close()
+            raise RequestEntityTooLarge(f"Each image can be at most {self._limit // MB} MB.")
+        return super().write(data)
+
+
+class UploadRequest(Request):
+    """app.request_class: per file size limit on multipart uploads"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if content_length is not None and content_length > MAX_UPLOAD_SIZE:
+            raise RequestEntityTooLarge(f"Each image can be at most {MAX_UPLOAD_SIZE // MB} MB.")
+        return _LimitedSpool(MAX_UPLOAD_SIZE, max_size=SPOOL_SIZE, mode="rb+")
+
+
+def sniff_image_type(stream):
+    """Extension for the image type in the first bytes of the stream, None if it isn't an image we take.
+    The stream is left at the start."""
+    head = stream.read(12)
+    stream.seek(0)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, ext in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return ext
+    return None
+
+
+def save_images(files):
+    """Validate every file, then store them all at the same time.
+    Returns the urls of each image (in order), raises InvalidImageError before
+    anything is written if one of them isn't an image."""
+    exts = []
+    for file in files:
+        ext = sniff_image_type(file.stream)
+        if ext is None:
+            raise InvalidImageError(f"{file.filename or 'File'} is not a PNG, JPEG, GIF or WebP image.")
+        exts.append(ext)
+
+    # hashing + copying is file I/O and hashlib, both let go of the GIL
+    stored = _pool.map(lambda pair: store_image(pair[0].stream, pair[1]), zip(files, exts))
+    return [urls for _digest, urls in stored]
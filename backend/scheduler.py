@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from db import items_col
+from events import emit, subscribe
+from item.recommend import refresh_recommendations, RECOMMEND_REFRESH
+
+# Background jobs, run on one daemon thread per process.
+# Jobs must be safe to run in several processes at once (every update is
+# conditional on the current status), since each worker runs its own scheduler.
+
+OVERDUE_INTERVAL = float(os.environ.get("OVERDUE_INTERVAL", 60))
+OVERDUE_BATCH = int(os.environ.get("OVERDUE_BATCH", 500))
+
+
+class Scheduler:
+    """Runs each job every `interval` seconds and keeps stats about the last run"""
+
+    def __init__(self):
+        self._jobs = []  # [name, interval, fn, next run]
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def every(self, interval, fn, name=None):
+        name = name or fn.__name__
+        self._jobs.append([name, interval, fn, time.monotonic() + interval])
+        self._stats[name] = {"interval": interval, "runs": 0, "failures": 0, "last_run": None,
+                             "last_seconds": None, "last_result": None}
+        return fn
+
+    def run_job(self, name):
+        """Run one job now (also used by the CLI), returns what it returned"""
+        fn = next((job[2] for job in self._jobs if job[0] == name), None)
+        if fn is None:
+            raise ValueError(f"No job named {name}")
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            with self._lock:
+                self._stats[name]["failures"] += 1
+            print(f"Job {name} failed: {e}")
+            return None
+        with self._lock:
+            stats = self._stats[name]
+            stats["runs"] += 1
+            stats["last_run"] = datetime.utcnow()
+            stats["last_seconds"] = round(time.perf_counter() - started, 4)
+            stats["last_result"] = result
+        return result
+
+    def _loop(self):
+        while True:
+            now = time.monotonic()
+            for job in self._jobs:
+                if job[3] <= now:
+                    self.run_job(job[0])
+                    job[3] = time.monotonic() + job[1]
+            time.sleep(max(0.5, min(job[3] for job in self._jobs) - time.monotonic()))
+
+    def start(self):
+        if self._thread is None and self._jobs:
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+scheduler = Scheduler()
+
+
+def mark_overdue(batch_size=OVERDUE_BATCH):
+    """Move loans past their return_date from "unavailable" to "overdue", a batch at a time.
+    Emits "loan_overdue" with the items this run moved (not the ones another worker got
+    to first). Returns the batch sizes and timings."""
+    now = datetime.utcnow()
+    run = uuid.uuid4().hex  # marks what this run moved, to read it back
+    batches = []
+    while True:
+        started = time.perf_counter()
+        due = list(items_col.find(
+            {"status": "unavailable", "return_date": {"$lt": now}},
+            {"_id": 1},
+        ).limit(batch_size))
+        if not due:
+            break
+        ids = [item["_id"] for item in due]
+        # status in the filter again: another process may have moved some already
+        items_col.update_many(
+            {"_id": {"$in": ids}, "status": "unavailable"},
+            {"$set": {"status": "overdue", "overdue_at": now, "overdue_run": run}},
+        )
+        moved = list(items_col.find(
+            {"_id": {"$in": ids}, "overdue_run": run},
+            {"_id": 1, "user_id": 1, "requester": 1, "title": 1, "return_date": 1},
+        ))
+        batches.append({"size": len(moved), "ms": round((time.perf_counter() - started) * 1000, 1)})
+        if moved:
+            emit("loan_overdue", moved)
+        if len(due) < batch_size:
+            break
+    if batches:
+        print(f"Marked {sum(b['size'] for b in batches)} loans overdue in {len(batches)} batches: {batches}")
+    return {"overdue": sum(b["size"] for b in batches), "batches": batches}
+
+
+def _remind(items):
+    # no notifications yet, leave a trace so the reminders can be checked
+    for item in items:
+        print(f"Reminder: {item.get('title')} was due back {item.get('return_date')}")
+
+
+subscribe("loan_overdue", _remind)
+scheduler.every(OVERDUE_INTERVAL, mark_overdue, "mark_overdue")
+scheduler.every(RECOMMEND_REFRESH, refresh_recommendations, "refresh_recommendations")
@@ -0,0 +1,25 @@
+import os
+import sys
+
+# Tests run on the in-process Mongo stand-in (requirements-dev.txt), no Atlas needed.
+# Set before anything imports db / the app.
+os.environ.setdefault("MONGO_BACKEND", "mongomock")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("SCHEDULER_ENABLED", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.fixture
+def login():
+    """login(user) -> headers with a session token for that user doc"""
+    from user.tokens import issue_token
+    return lambda user: {"Authorization": f"Bearer {issue_token(user)}"}
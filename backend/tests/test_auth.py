@@ -0,0 +1,48 @@
+import pytest
+from bson.objectid import ObjectId
+from db import items_col
+from user import tokens
+
+
+def make_user(school="TMU"):
+    return {"_id": ObjectId(), "profile": {"school": school, "program": "Nursing"}}
+
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Authorization": "Bearer not-a-token"},
+    {"Authorization": "Token abc"},
+])
+def test_missing_or_forged_token_is_a_401(client, headers):
+    assert client.get("/items", headers=headers).status_code == 401
+
+
+def test_token_signed_with_another_key_is_a_401(client):
+    from itsdangerous import URLSafeTimedSerializer
+    forged = URLSafeTimedSerializer("another key", salt="session").dumps(
+        {"uid": str(ObjectId()), "school": "TMU", "program": "Nursing"})
+    assert client.get("/items", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+
+
+def test_expired_token_is_a_401(client, login, monkeypatch):
+    headers = login(make_user())
+    assert client.get("/items", headers=headers).status_code == 200
+    monkeypatch.setattr(tokens, "SESSION_MAX_AGE", -1)
+    assert client.get("/items", headers=headers).status_code == 401
+
+
+@pytest.mark.parametrize("url", ["/items/activity/{}", "/my_requests/{}", "/items/loaned/{}"])
+def test_other_users_lists_are_a_403(client, login, url):
+    me, other = make_user(), make_user()
+    assert client.get(url.format(other["_id"]), headers=login(me)).status_code == 403
+    assert client.get(url.format(me["_id"]), headers=login(me)).status_code == 200
+
+
+def test_request_ignores_requester_id_in_the_body(client, login):
+    me, other = make_user(), make_user()
+    item_id = items_col.insert_one({"school": "TMU", "status": "available", "user_id": ObjectId()}).inserted_id
+
+    response = client.post(f"/items/{item_id}/request", headers=login(me),
+                           json={"requester_id": str(other["_id"])})
+    assert response.status_code == 200
+    assert items_col.find_one({"_id": item_id})["requester"] == me["_id"]
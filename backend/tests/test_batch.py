@@ -0,0 +1,46 @@
+from bson.objectid import ObjectId
+from db import items_col
+from item.search import reindex_items
+
+
+def insert_items(count, **fields):
+    items = [{"school": "TMU", "status": "available", "user_id": ObjectId(), **fields} for _ in range(count)]
+    items_col.insert_many(items)
+    return [item["_id"] for item in items]
+
+
+def test_batch_request(client, login):
+    me = {"_id": ObjectId(), "profile": {"school": "TMU"}}
+    free = insert_items(2)
+    taken = insert_items(1, status="unavailable", requester=ObjectId())
+
+    response = client.post("/items/batch/request", headers=login(me),
+                           json={"item_ids": [str(free[0]), str(taken[0]), str(free[1]), "nope"]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["requested"] == 2 and body["failed"] == 2
+    assert [("status" in result) for result in body["results"]] == [True, False, True, False]
+    assert items_col.count_documents({"_id": {"$in": free}, "requester": me["_id"]}) == 2
+    assert items_col.find_one({"_id": taken[0]})["requester"] != me["_id"]
+
+
+def test_batch_archive_only_takes_own_available_items(client, login):
+    me = {"_id": ObjectId(), "profile": {"school": "TMU"}}
+    mine = insert_items(2, user_id=me["_id"])
+    on_loan = insert_items(1, user_id=me["_id"], status="unavailable")
+    theirs = insert_items(1)
+
+    response = client.post("/items/batch/archive", headers=login(me),
+                           json={"item_ids": [str(item_id) for item_id in mine + on_loan + theirs]})
+    assert response.get_json()["archived"] == 2
+    assert items_col.count_documents({"_id": {"$in": mine}, "status": "removed"}) == 2
+    assert items_col.find_one({"_id": on_loan[0]})["status"] == "unavailable"
+    assert items_col.find_one({"_id": theirs[0]})["status"] == "available"
+
+
+def test_reindex_items():
+    item_ids = insert_items(3, title="Desk lamp", description="bright LED", category="Furniture")
+    assert reindex_items(items_col, batch_size=2) >= 3
+    for item in items_col.find({"_id": {"$in": item_ids}}):
+        assert item["title_terms"] == ["desk", "lamp"]
+        assert "furniture" in item["search_terms"]
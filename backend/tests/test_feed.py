@@ -0,0 +1,232 @@
+import threading
+import time
+from bson.objectid import ObjectId
+from item.feed import FeedCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_items(n, owner=None):
+    """n items, newest first like the feed query returns them"""
+    owners = [ObjectId() for _ in range(3)]
+    items = [{"_id": ObjectId(), "user_id": owner or owners[i % 3], "title": f"item {i}"} for i in range(n)]
+    return sorted(items, key=lambda item: item["_id"], reverse=True)
+
+
+def ids(items):
+    return [item["_id"] for item in items]
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_fresh_feed_is_loaded_once_and_served_from_memory():
+    items = make_items(5)
+    loads = []
+    cache = FeedCache(load=lambda school, n: loads.append(school) or items, ttl=30, stale_ttl=300,
+                      max_items=100, clock=Clock())
+
+    for _ in range(3):
+        page, next_cursor = cache.page("TMU", None, 10)
+        assert ids(page) == ids(items)
+        assert next_cursor is None
+    assert loads == ["TMU"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_concurrent_misses_load_each_school_once():
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def load(school, n):
+        loads.append(school)
+        started.set()
+        release.wait(2)
+        return make_items(3)
+
+    cache = FeedCache(load=load, ttl=30, stale_ttl=300, max_items=100, clock=Clock())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.page("TMU", None, 10))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["TMU"]
+    assert len(results) == 10 and all(result is not None and len(result[0]) == 3 for result in results)
+
+    cache.page("York", None, 10)
+    assert loads == ["TMU", "York"]
+
+
+def test_stale_feed_is_served_while_one_refresh_runs():
+    clock = Clock()
+    old, new = make_items(2), make_items(4)
+    release = threading.Event()
+    loads = []
+
+    def load(school, n):
+        loads.append(school)
+        if len(loads) == 1:
+            return old
+        release.wait(2)
+        return new
+
+    cache = FeedCache(load=load, ttl=30, stale_ttl=300, max_items=100, clock=clock)
+    cache.page("TMU", None, 10)
+    clock.now += 60  # past ttl, within stale_ttl
+
+    # served the old list right away, however many requests come in while reloading
+    for _ in range(5):
+        page, _ = cache.page("TMU", None, 10)
+        assert ids(page) == ids(old)
+    release.set()
+    wait_for(lambda: cache.stats()["loads"] == 2)
+    assert loads == ["TMU", "TMU"]
+    page, _ = cache.page("TMU", None, 10)
+    assert ids(page) == ids(new)
+
+
+def test_too_old_feed_is_reloaded_before_serving():
+    clock = Clock()
+    feeds = [make_items(2), make_items(3)]
+    cache = FeedCache(load=lambda school, n: feeds.pop(0), ttl=30, stale_ttl=300, max_items=100, clock=clock)
+    cache.page("TMU", None, 10)
+    clock.now += 301
+    page, _ = cache.page("TMU", None, 10)
+    assert len(page) == 3
+
+
+def test_callers_own_items_are_skipped():
+    me = ObjectId()
+    items = sorted(make_items(4) + make_items(3, owner=me), key=lambda item: item["_id"], reverse=True)
+    cache = FeedCache(load=lambda school, n: items, max_items=100, clock=Clock())
+    page, _ = cache.page("TMU", me, 10)
+    assert len(page) == 4
+    assert all(item["user_id"] != me for item in page)
+
+
+def test_pages_follow_the_cursor():
+    items = make_items(7)
+    cache = FeedCache(load=lambda school, n: items, max_items=100, clock=Clock())
+
+    seen, cursor = [], None
+    while True:
+        page, next_cursor = cache.page("TMU", None, 3, {"id": cursor} if cursor else None)
+        seen += page
+        if next_cursor is None:
+            break
+        cursor = ObjectId(str(page[-1]["_id"]))
+    assert ids(seen) == ids(items)
+
+
+def test_cursor_past_the_cached_window_goes_to_mongo():
+    items = make_items(5)
+    cache = FeedCache(load=lambda school, n: items[:n], max_items=5, clock=Clock())
+    # the list is full, there may be older items that aren't cached
+    page, next_cursor = cache.page("TMU", None, 3)
+    assert len(page) == 3 and next_cursor
+    assert cache.page("TMU", None, 3, {"id": page[-1]["_id"]}) is None
+
+
+def test_invalidate_drops_the_requested_item_right_away():
+    clock = Clock()
+    items = make_items(4)
+    release = threading.Event()
+    loads = []
+
+    def load(school, n):
+        loads.append(school)
+        if len(loads) > 1:
+            release.wait(2)
+        return items
+
+    cache = FeedCache(load=load, ttl=30, stale_ttl=300, max_items=100, clock=clock)
+    before, _ = cache.page("TMU", None, 10)
+    requested = items[1]["_id"]
+
+    cache.invalidate("TMU", removed=requested)
+    page, _ = cache.page("TMU", None, 10)  # stale: served, and a refresh starts
+    assert requested not in ids(page)
+    assert len(page) == 3
+    assert len(before) == 4  # a page already handed out isn't changed under the request
+    release.set()
+    wait_for(lambda: cache.stats()["loads"] == 2)
+
+
+def test_item_requested_during_a_refresh_stays_out_of_the_feed():
+    clock = Clock()
+    items = make_items(4)
+    reading = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def load(school, n):
+        loads.append(school)
+        if len(loads) > 1:
+            # the refresh reads the list while the item is still available...
+            snapshot = list(items)
+            reading.set()
+            release.wait(2)
+            return snapshot
+        return items
+
+    cache = FeedCache(load=load, ttl=30, stale_ttl=300, max_items=100, clock=clock)
+    cache.page("TMU", None, 10)
+    clock.now += 60
+    cache.page("TMU", None, 10)  # stale: starts the background refresh
+    assert reading.wait(2)
+
+    requested = items[2]["_id"]
+    cache.invalidate("TMU", removed=requested)  # ...and it is requested before the refresh lands
+    release.set()
+    wait_for(lambda: cache.stats()["loads"] == 2)
+
+    page, _ = cache.page("TMU", None, 10)
+    assert requested not in ids(page)
+    assert len(page) == 3
+
+
+def test_invalidate_during_a_load_keeps_the_result_stale():
+    release = threading.Event()
+    loads = []
+
+    def load(school, n):
+        loads.append(school)
+        if len(loads) == 1:
+            release.wait(2)
+        return make_items(2)
+
+    cache = FeedCache(load=load, ttl=30, stale_ttl=300, max_items=100, clock=Clock())
+    first = threading.Thread(target=cache.page, args=("TMU", None, 10))
+    first.start()
+    wait_for(lambda: loads)
+    cache.invalidate("TMU")  # e.g. an item created while the load was reading
+    release.set()
+    first.join()
+
+    assert cache.stats()["schools"]["TMU"]["stale"]
+    cache.page("TMU", None, 10)
+    wait_for(lambda: cache.stats()["loads"] == 2)
+
+
+def test_failed_load_falls_back_to_mongo():
+    def load(school, n):
+        raise RuntimeError("db down")
+
+    cache = FeedCache(load=load, max_items=100, clock=Clock())
+    assert cache.page("TMU", None, 10) is None
+    assert cache.stats()["load_errors"] == 1
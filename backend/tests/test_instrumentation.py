@@ -0,0 +1,37 @@
+from flask import Flask
+import instrumentation
+
+
+def make_app(monkeypatch, tmp_path, token="secret", max_files=2):
+    monkeypatch.setattr(instrumentation, "PROFILE_TOKEN", token)
+    monkeypatch.setattr(instrumentation, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(instrumentation, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(instrumentation, "PROFILE_MAX_FILES", max_files)
+    app = Flask(__name__)
+    app.before_request(instrumentation.before_request)
+    app.after_request(instrumentation.after_request)
+    app.teardown_request(instrumentation.teardown_request)
+    app.add_url_rule("/ping", "ping", lambda: "pong")
+    return app.test_client()
+
+
+def test_profiling_needs_the_token(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path)
+    for headers in ({}, {"X-Profile": "1"}, {"X-Profile": "wrong"}):
+        assert "X-Profile-File" not in client.get("/ping", headers=headers).headers
+    assert list(tmp_path.iterdir()) == []
+
+    assert "X-Profile-File" in client.get("/ping", headers={"X-Profile": "secret"}).headers
+
+
+def test_no_token_no_profiling(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path, token="")
+    assert "X-Profile-File" not in client.get("/ping", headers={"X-Profile": ""}).headers
+
+
+def test_only_the_newest_profiles_are_kept(monkeypatch, tmp_path):
+    client = make_app(monkeypatch, tmp_path)
+    for n in range(4):
+        (tmp_path / f"100{n}-GET-old.prof").write_bytes(b"")
+    name = client.get("/ping", headers={"X-Profile": "secret"}).headers["X-Profile-File"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["1003-GET-old.prof", name]
@@ -0,0 +1,50 @@
+import base64
+import json
+import pytest
+from bson.objectid import ObjectId
+from item.pagination import decode_cursor, encode_cursor, InvalidCursorError
+from user.tokens import issue_token
+
+
+def forge(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    item_id = ObjectId()
+    cursor = decode_cursor(encode_cursor(score=1.5, id=str(item_id)), scored=True)
+    assert cursor == {"score": 1.5, "id": item_id}
+
+
+@pytest.mark.parametrize("values", [
+    {"score": 1},
+    {"id": 5},
+    {"id": "not an object id"},
+    ["a", "list"],
+])
+def test_cursor_needs_an_id(values):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(forge(values))
+
+
+@pytest.mark.parametrize("score", [None, "1", True, [1]])
+def test_scored_cursor_needs_a_numeric_score(score):
+    values = {"id": str(ObjectId())}
+    if score is not None:
+        values["score"] = score
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(forge(values), scored=True)
+
+
+def test_forged_cursors_are_a_400():
+    from app import app
+    headers = {"Authorization": f"Bearer {issue_token({'_id': ObjectId(), 'profile': {'school': 'TMU'}})}"}
+    client = app.test_client()
+    no_id = forge({"score": 1})
+    text_score = forge({"id": str(ObjectId()), "score": "1"})
+    for url in (f"/items?cursor={no_id}",
+                f"/search?query=lamp&cursor={no_id}", f"/search?query=lamp&cursor={text_score}",
+                f"/items/recommended?cursor={no_id}", f"/items/recommended?cursor={text_score}"):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 400, url
+        assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,41 @@
+import hashlib
+from bson.objectid import ObjectId
+from db import users_col
+from user import passwords
+
+
+def insert_legacy_user(password):
+    salt = "legacy-salt"
+    user_id = ObjectId()
+    user = {
+        "_id": user_id,
+        "username": f"legacy-{user_id}",
+        "email": f"legacy-{user_id}@torontomu.ca",
+        "password_hash": hashlib.sha256((password + salt).encode()).hexdigest(),
+        "salt": salt,
+        "profile": {"school": "TMU", "program": "Nursing"},
+    }
+    users_col.insert_one(user)
+    return user
+
+
+def test_legacy_hash_is_upgraded_on_login(client):
+    user = insert_legacy_user("hunter22")
+    assert passwords.needs_rehash(user)
+
+    response = client.post("/login", json={"email": user["email"], "password": "hunter22"})
+    assert response.status_code == 200
+
+    stored = users_col.find_one({"_id": user["_id"]})
+    assert stored["password_algo"] == passwords.ALGO
+    assert not passwords.needs_rehash(stored)
+    assert passwords.verify_password("hunter22", stored)
+    # and the new hash still logs in
+    assert client.post("/login", json={"email": user["email"], "password": "hunter22"}).status_code == 200
+
+
+def test_wrong_password_does_not_rehash(client):
+    user = insert_legacy_user("hunter22")
+    response = client.post("/login", json={"email": user["email"], "password": "wrong"})
+    assert response.status_code == 401
+    assert users_col.find_one({"_id": user["_id"]})["password_hash"] == user["password_hash"]
@@ -0,0 +1,31 @@
+from bson.objectid import ObjectId
+from db import items_col, users_col
+
+
+def test_rating_twice_counts_once(client, login):
+    owner_id, borrower_id = ObjectId(), ObjectId()
+    users_col.insert_one({"_id": owner_id, "username": f"owner-{owner_id}", "email": f"owner-{owner_id}@torontomu.ca",
+                          "profile": {"school": "TMU", "#ofratings": 0, "rating": 0}})
+    item_id = items_col.insert_one({"school": "TMU", "status": "unavailable", "user_id": owner_id,
+                                    "requester": borrower_id}).inserted_id
+    headers = login({"_id": borrower_id, "profile": {"school": "TMU"}})
+
+    first = client.post(f"/items/rate/{item_id}", headers=headers, json={"rating": 4})
+    assert first.status_code == 200
+    assert first.get_json() == {"message": "Rating submitted successfully"}
+    second = client.post(f"/items/rate/{item_id}", headers=headers, json={"rating": 4})
+    assert second.status_code == 200
+    assert second.get_json() == {"message": "Rating already submitted"}
+
+    profile = users_col.find_one({"_id": owner_id})["profile"]
+    assert profile["#ofratings"] == 1
+    assert profile["rating"] == 4
+    assert items_col.find_one({"_id": item_id})["status"] == "old"
+
+
+def test_only_the_borrower_can_rate(client, login):
+    item_id = items_col.insert_one({"school": "TMU", "status": "unavailable", "user_id": ObjectId(),
+                                    "requester": ObjectId()}).inserted_id
+    response = client.post(f"/items/rate/{item_id}", headers=login({"_id": ObjectId(), "profile": {}}),
+                           json={"rating": 5})
+    assert response.status_code == 403
@@ -0,0 +1,140 @@
+from bson.objectid import ObjectId
+from db import items_col
+from item.recommend import CandidateIndex, candidate_score, refresh_recommendations
+
+
+def make_item(school="TMU", program="Nursing", condition="fair", rating_score=3.0, user_id=None):
+    return {
+        "_id": ObjectId(),
+        "school": school,
+        "program": program,
+        "condition": condition,
+        "user_id": user_id or ObjectId(),
+        "owner": {"profile": {"rating_score": rating_score}},
+    }
+
+
+def all_pages(index, school, program, limit, exclude_user=None):
+    seen, cursor = [], None
+    while True:
+        items, scores = index.page(school, program, limit, cursor, exclude_user=exclude_user)
+        if len(items) <= limit:
+            return seen + items
+        items, scores = items[:limit], scores[:limit]
+        seen += items
+        cursor = {"score": scores[-1], "id": str(items[-1]["_id"])}
+
+
+def expected_order(items, program):
+    return sorted(items, key=lambda item: (-candidate_score(item, program), -int(str(item["_id"]), 16)))
+
+
+def test_page_ranks_by_score_then_newest():
+    items = [make_item(program=program, condition=condition, rating_score=rating)
+             for program in ("Nursing", "Business")
+             for condition in ("excellent", "poor")
+             for rating in (2.0, 4.5)]
+    index = CandidateIndex()
+    index.rebuild(items)
+
+    ranked = all_pages(index, "TMU", "Nursing", 3)
+    assert ranked == expected_order(items, "Nursing")
+    # same owner rating + condition: the user's own program first
+    position = {item["_id"]: n for n, item in enumerate(ranked)}
+    for nursing, business in zip(items[:4], items[4:]):
+        assert position[nursing["_id"]] < position[business["_id"]]
+
+
+def test_page_keeps_to_the_school_and_skips_the_user():
+    me = ObjectId()
+    mine = make_item(user_id=me)
+    others = [make_item() for _ in range(4)]
+    index = CandidateIndex()
+    index.rebuild([mine, *others, make_item(school="York")])
+
+    ranked = all_pages(index, "TMU", "Nursing", 2, exclude_user=me)
+    assert sorted(item["_id"] for item in ranked) == sorted(item["_id"] for item in others)
+
+
+def test_add_inserts_in_rank_order():
+    items = [make_item(condition="fair") for _ in range(3)]
+    index = CandidateIndex()
+    index.rebuild(items)
+    index.page("TMU", "Nursing", 10)  # builds the ranked list that add() has to keep sorted
+
+    best = make_item(condition="excellent", rating_score=5.0)
+    worst = make_item(program="Business", condition="poor", rating_score=1.0)
+    index.add(best)
+    index.add(worst)
+
+    ranked, scores = index.page("TMU", "Nursing", 10)
+    assert ranked == expected_order(items + [best, worst], "Nursing")
+    assert ranked[0] is best and ranked[-1] is worst
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_add_respects_max_candidates():
+    index = CandidateIndex(max_candidates=3)
+    index.rebuild([make_item(condition="excellent") for _ in range(3)])
+    index.page("TMU", "Nursing", 10)
+
+    index.add(make_item(condition="poor"))  # ranks below the full list: dropped
+    best = make_item(condition="excellent", rating_score=5.0)
+    index.add(best)  # pushes the last one out
+
+    ranked, _ = index.page("TMU", "Nursing", 10)
+    assert len(ranked) == 3
+    assert ranked[0] is best
+    assert all(item["condition"] == "excellent" for item in ranked)
+
+
+def test_remove_takes_the_item_out_of_every_list():
+    items = [make_item(program=program) for program in ("Nursing", "Business", "Nursing")]
+    index = CandidateIndex()
+    index.rebuild(items)
+    index.page("TMU", "Nursing", 10)
+    index.page("TMU", "Business", 10)
+
+    index.remove(items[0]["_id"])
+    index.remove(ObjectId())  # unknown id: nothing happens
+
+    for program in ("Nursing", "Business"):
+        ranked, _ = index.page("TMU", program, 10)
+        assert items[0] not in ranked and len(ranked) == 2
+    # lists built after the removal don't have it either
+    assert items[0] not in index.page("TMU", "Engineering", 10)[0]
+
+
+def test_recommended_route_pages_and_drops_requested_items(client, login):
+    school = f"school-{ObjectId()}"  # the db is shared between tests
+    items = [make_item(school=school, program=program, condition=condition, rating_score=rating)
+             for program in ("Nursing", "Business")
+             for condition in ("excellent", "poor")
+             for rating in (2.0, 4.5)]
+    for item in items:
+        item["status"] = "available"
+    items_col.insert_many(items)
+    refresh_recommendations()
+    user = {"_id": ObjectId(), "profile": {"school": school, "program": "Nursing"}}
+    headers = login(user)
+
+    def all_ids():
+        seen, cursor = [], None
+        while True:
+            url = "/items/recommended?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200
+            page = response.get_json()
+            assert len(page["items"]) <= 3
+            seen += [item["_id"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                return seen
+
+    assert all_ids() == [str(item["_id"]) for item in expected_order(items, "Nursing")]
+
+    requested = items[2]["_id"]
+    response = client.post(f"/items/{requested}/request", headers=headers)
+    assert response.status_code == 200
+    assert all_ids() == [str(item["_id"]) for item in expected_order(items, "Nursing")
+                         if item["_id"] != requested]
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from bson.objectid import ObjectId
+from db import users_col
+
+# Everything about a user except the password fields
+PUBLIC_USER_PROJECTION = {"password_hash": 0, "salt": 0, "password_algo": 0, "kdf_params": 0}
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds (thread safe).
+
+    Keeps hit / miss / eviction counters so the size can be tuned under load.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Public user documents by _id, shared by User.get_user_by_id, browse and search.
+# Cached docs are shared between requests, treat them as read only.
+user_cache = TTLCache(
+    maxsize=int(os.environ.get("USER_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("USER_CACHE_TTL", 300)),
+)
+
+
+def _from_cache(user_ids):
+    """(cached users by _id, ids that still have to be fetched)"""
+    users = {}
+    missing = []
+    for user_id in {ObjectId(user_id) for user_id in user_ids}:
+        user = user_cache.get(user_id)
+        if user is None:
+            missing.append(user_id)
+        else:
+            users[user_id] = user
+    return users, missing
+
+
+def get_public_users(user_ids):
+    """{_id: public user doc} for the given ids, only the cache misses hit the db (one $in query)"""
+    users, missing = _from_cache(user_ids)
+    if missing:
+        for user in users_col.find({"_id": {"$in": missing}}, dict(PUBLIC_USER_PROJECTION)):
+            user_cache.set(user["_id"], user)
+            users[user["_id"]] = user
+    return users
+
+
+async def get_public_users_async(async_users_col, user_ids):
+    """get_public_users for the async app (same cache, async driver for the misses)"""
+    users, missing = _from_cache(user_ids)
+    if missing:
+        async for user in async_users_col.find({"_id": {"$in": missing}}, dict(PUBLIC_USER_PROJECTION)):
+            user_cache.set(user["_id"], user)
+            users[user["_id"]] = user
+    return users
+
+
+def get_public_user(user_id):
+    """Public user doc for one id (cached), None if there is no such user"""
+    return get_public_users([user_id]).get(ObjectId(user_id))
+
+
+def invalidate_user(user_id):
+    """Call after changing a user document (rating, profile) so nobody reads the old one"""
+    user_cache.invalidate(ObjectId(user_id))
@@ -1,22 +1,36 @@
-import hashlib
-import secrets
 from flask import Flask, jsonify
 from flask import current_app
 from db import users_col
-from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from .cache import get_public_user
+from . import passwords
+from .tokens import issue_token
+
+# names of the unique indexes in indexes.py
+UNIQUE_USER_INDEXES = {"email_unique", "username_unique"}
+_unique_indexes_ready = False
+
+def unique_indexes_ready():
+    """True once the user collection has its unique email / username indexes
+    (checked with listIndexes until they show up, then remembered)"""
+    global _unique_indexes_ready
+    if not _unique_indexes_ready:
+        try:
+            _unique_indexes_ready = UNIQUE_USER_INDEXES <= set(users_col.index_information())
+        except PyMongoError:
+            return False
+    return _unique_indexes_ready
 
 class User:
     @staticmethod
     def hash_password(password, salt=None):
-        if salt is None:
-            salt = secrets.token_hex(16)
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return password_hash, salt
+        """scrypt hash fields for a new password (runs on the hashing pool, see passwords.py)"""
+        return passwords.run_in_pool(passwords.hash_password, password, salt)
     
     @staticmethod
-    def verify_password(password, stored_hash, salt):
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return password_hash == stored_hash
+    def verify_password(password, user):
+        """Check a password against a user document (scrypt or legacy sha256, constant time)"""
+        return passwords.run_in_pool(passwords.verify_password, password, user)
 
     @staticmethod
     def signup(username, email, password, possible_dates, profile, program, degree):
@@ -42,18 +56,20 @@ class User:
         if not school:
             return {"error": "Only TMU, UofT, York and Western emails are allowed"}, 400
 
-        #Check if username already exists
-        existing_user = users_col.find_one({"username": username})
-        if existing_user:
-            return {"error": "Username already exists"}, 400
-        
-        #Check if email already exists
-        existing_email = users_col.find_one({"email": email})
-        if existing_email:
-            return {"error": "Email already exists"}, 400
-        
+        #Username / email uniqueness is enforced by unique indexes (see indexes.py),
+        #the insert below fails with DuplicateKeyError. Until those indexes exist (built
+        #in the background at startup, or the build failed) check by hand like before
+        if not unique_indexes_ready():
+            if users_col.find_one({"email": email}, {"_id": 1}):
+                return {"error": "Email already exists"}, 400
+            if users_col.find_one({"username": username}, {"_id": 1}):
+                return {"error": "Username already exists"}, 400
+
         #Hashes password
-        password_hash, salt = User.hash_password(password)
+        try:
+            password_fields = User.hash_password(password)
+        except passwords.HashingBusyError as e:
+            return {"error": str(e)}, 503
 
         #maybe add avatar/profile pic later
 
@@ -62,8 +78,7 @@ class User:
         user = {
             "username": username,
             "email": email,
-            "password_hash": password_hash,
-            "salt": salt,
+            **password_fields, # password_hash, salt, password_algo, kdf_params
             "possible_dates": possible_dates,
             
             "profile": {
@@ -76,7 +91,16 @@ class User:
 
             
         }
-        result = users_col.insert_one(user)
+        try:
+            result = users_col.insert_one(user)
+        except DuplicateKeyError as e:
+            key = (e.details or {}).get("keyPattern") or {}
+            if not key:
+                #server didn't say which index, only look it up on this (rare) path
+                key = {"email": 1} if users_col.find_one({"email": email}, {"_id": 1}) else {"username": 1}
+            if "email" in key:
+                return {"error": "Email already exists"}, 400
+            return {"error": "Username already exists"}, 400
         return {"message": "User created successfully"}, 200
 
     @staticmethod
@@ -93,15 +117,28 @@ class User:
             return {"error": "Invalid credentials"}, 401
 
         # verify password
-        input_hash, _ = User.hash_password(password, user["salt"])
-        if input_hash == user["password_hash"]:
+        try:
+            valid = User.verify_password(password, user)
+        except passwords.HashingBusyError as e:
+            return {"error": str(e)}, 503
+
+        if valid and passwords.needs_rehash(user):
+            # old sha256 user (or old cost params): upgrade while we have the password
+            try:
+                users_col.update_one({"_id": user["_id"]}, {"$set": User.hash_password(password)})
+            except passwords.HashingBusyError:
+                pass # not urgent, next login will do it
+
+        if valid:
             # Remove sensitive data before returning
             user_data = {
                 "user_id": str(user["_id"]),
                 "username": user["username"],
                 "email": user["email"],
                 "profile": user.get("profile", {}),
-                "possible_dates": user.get("possible_dates", [])
+                "possible_dates": user.get("possible_dates", []),
+                # send as "Authorization: Bearer <token>" on every other request
+                "token": issue_token(user)
             }
 
             return user_data, 200
@@ -110,9 +147,9 @@ class User:
 
     @staticmethod
     def get_user_by_id(user_id):
-        """Get user by user_id"""
+        """Get user by user_id (served from the user cache when possible)"""
         try:
-            user = users_col.find_one({"_id": ObjectId(user_id)})
+            user = get_public_user(user_id)
             if user:
                 # Return user data without sensitive information
                 user_data = {
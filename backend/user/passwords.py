@@ -0,0 +1,83 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Password hashing.
+# New hashes use scrypt (memory hard) with the cost parameters stored next to the
+# hash, so the cost can be raised later and old users get rehashed on login.
+# Users created before that only have sha256(password + salt), see LEGACY_ALGO.
+
+ALGO = "scrypt"
+LEGACY_ALGO = "sha256"
+
+# Cost of new hashes. n=2**14, r=8 -> 16 MB and tens of ms per hash.
+KDF_PARAMS = {
+    "n": int(os.environ.get("PASSWORD_SCRYPT_N", 2 ** 14)),
+    "r": int(os.environ.get("PASSWORD_SCRYPT_R", 8)),
+    "p": int(os.environ.get("PASSWORD_SCRYPT_P", 1)),
+}
+KEY_LENGTH = 32
+
+# Hashing runs in its own small pool (hashlib drops the GIL while it works) so a
+# burst of logins can only use PASSWORD_WORKERS cores. At most PASSWORD_QUEUE more
+# can wait for a slot, beyond that we answer "busy" instead of tying up Flask workers.
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", 2))
+PASSWORD_QUEUE = int(os.environ.get("PASSWORD_QUEUE", 16))
+
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password")
+_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE)
+
+
+class HashingBusyError(Exception):
+    """Too many password hashes queued, try again later"""
+    def __str__(self) -> str:
+        return "Server busy, please try again"
+
+
+def _derive(password, salt, params):
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(),
+        n=params["n"], r=params["r"], p=params["p"],
+        maxmem=128 * params["r"] * params["n"] * 2, dklen=KEY_LENGTH,
+    ).hex()
+
+
+def run_in_pool(fn, *args):
+    """Run fn(*args) on the hashing pool and wait for it, HashingBusyError if the queue is full"""
+    if not _slots.acquire(blocking=False):
+        raise HashingBusyError
+    try:
+        return _pool.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password, salt=None, params=None):
+    """Fields to store on the user for a new password"""
+    salt = salt or secrets.token_hex(16)
+    params = dict(params or KDF_PARAMS)
+    return {
+        "password_hash": _derive(password, salt, params),
+        "salt": salt,
+        "password_algo": ALGO,
+        "kdf_params": params,
+    }
+
+
+def verify_password(password, user):
+    """Check password against a user document, constant time compare"""
+    stored_hash = user.get("password_hash", "")
+    salt = user.get("salt", "")
+    if user.get("password_algo", LEGACY_ALGO) == LEGACY_ALGO:
+        input_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+    else:
+        input_hash = _derive(password, salt, user.get("kdf_params", KDF_PARAMS))
+    return hmac.compare_digest(input_hash, stored_hash)
+
+
+def needs_rehash(user):
+    """True for legacy sha256 users and hashes made with other cost parameters"""
+    return user.get("password_algo", LEGACY_ALGO) != ALGO or user.get("kdf_params") != KDF_PARAMS
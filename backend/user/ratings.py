@@ -0,0 +1,41 @@
+import os
+
+# Owner ratings.
+# Users keep the raw rating_sum / rating_count, and every rating also recomputes
+# (in the same update, server side) what the app reads:
+#   profile.rating        plain average, shown next to the username
+#   profile.#ofratings    how many ratings that is
+#   profile.rating_score  Bayesian average used for ranking: the ratings plus
+#                         RATING_PRIOR_WEIGHT imaginary ones of RATING_PRIOR_MEAN,
+#                         so one 5 star rating doesn't beat twenty 4.8s
+
+RATING_PRIOR_MEAN = float(os.environ.get("RATING_PRIOR_MEAN", 3))
+RATING_PRIOR_WEIGHT = float(os.environ.get("RATING_PRIOR_WEIGHT", 5))
+
+
+def rating_fields_stage():
+    """Update pipeline stage: profile.rating / #ofratings / rating_score from rating_sum and rating_count"""
+    return {"$set": {
+        "profile.#ofratings": "$rating_count",
+        "profile.rating": {"$divide": ["$rating_sum", "$rating_count"]},
+        "profile.rating_score": {"$divide": [
+            {"$add": [RATING_PRIOR_MEAN * RATING_PRIOR_WEIGHT, "$rating_sum"]},
+            {"$add": [RATING_PRIOR_WEIGHT, "$rating_count"]},
+        ]},
+    }}
+
+
+def add_rating(value):
+    """Update pipeline that adds one rating to a user and recomputes the aggregates atomically"""
+    return [
+        {"$set": {
+            "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, value]},
+            "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, 1]},
+        }},
+        rating_fields_stage(),
+    ]
+
+
+def recompute_ratings(users_col):
+    """Fill in the aggregates for users rated before they existed. Returns how many users changed."""
+    return users_col.update_many({"rating_count": {"$gt": 0}}, [rating_fields_stage()]).modified_count
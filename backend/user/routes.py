@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from db import users_col
 from user.models import User
+from user.cache import user_cache
 
 from . import user_bp
 
@@ -41,3 +42,7 @@ def get_user(user_id):
     else:
         return jsonify({"error": "User not found"}), 404
 
+@user_bp.route("/user/cache/stats", methods=["GET"])
+def get_user_cache_stats():
+    """hit / miss / eviction counters of the user profile cache"""
+    return jsonify(user_cache.stats()), 200
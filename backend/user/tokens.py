@@ -0,0 +1,59 @@
+import os
+from functools import lru_cache, wraps
+from flask import g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+# Stateless session tokens.
+# /login hands out a signed token carrying the user id, school and program, and
+# routes read those claims from the token instead of trusting a user_id from the
+# query string / form or re-fetching the user. Checking a token is just an HMAC,
+# no database hit.
+
+SESSION_MAX_AGE = int(os.environ.get("SESSION_MAX_AGE", 7 * 24 * 3600))
+
+
+@lru_cache(maxsize=1)
+def _serializer():
+    """Built once per process, the signing key is derived on first use and reused"""
+    secret = os.environ.get("SECRET_KEY")
+    if not secret:
+        raise ValueError("SECRET_KEY environment variable is not set.")
+    return URLSafeTimedSerializer(secret, salt="session")
+
+
+def issue_token(user):
+    """Token for a user document (or the public user data returned by login)"""
+    profile = user.get("profile", {})
+    return _serializer().dumps({
+        "uid": str(user.get("_id", user.get("user_id"))),
+        "username": user.get("username"),
+        "school": profile.get("school"),
+        "program": profile.get("program"),
+    })
+
+
+def verify_token(token):
+    """The claims in a token, None if it is forged, malformed or expired"""
+    try:
+        return _serializer().loads(token, max_age=SESSION_MAX_AGE)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def login_required(view):
+    """Route decorator: needs `Authorization: Bearer <token>`, puts the claims in g.session"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "")
+        scheme, _, token = header.partition(" ")
+        claims = verify_token(token) if scheme.lower() == "bearer" and token else None
+        if not claims:
+            return jsonify({"error": "Login required"}), 401
+        g.session = claims
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def is_current_user(user_id):
+    """True if user_id is the logged in user (for routes that take a user id in the path)"""
+    return g.session["uid"] == user_id
@@ -85,4 +85,10 @@ export const apiService = {
     const response = await api.get(`/items/loaned/${userId}`);
     return response.data;
   },
+
+  // Borrowing + lending of the logged in user in one call (see DashboardResponse)
+  getDashboard: async (limit?: number) => {
+    const response = await api.get('/items/dashboard', { params: limit ? { limit } : {} });
+    return response.data;
+  },
 };
\ No newline at end of file
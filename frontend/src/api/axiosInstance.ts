@@ -7,15 +7,13 @@ const axiosInstance: AxiosInstance = axios.create({
   },
 });
 
-// Request interceptor - can be used for adding user_id or other headers if needed
+// Request interceptor - sends the session token from /login with every request
 axiosInstance.interceptors.request.use(
   (config: InternalAxiosRequestConfig) => {
-    // Backend doesn't use JWT tokens currently
-    // If needed in the future, you can add user_id or token here
-    const userId = localStorage.getItem('user_id');
-    if (userId && config.headers) {
-      // Some endpoints might need user_id in headers or params
-      // This is a placeholder for future authentication
+    // The backend takes the user id, school and program from this token
+    const token = localStorage.getItem('token');
+    if (token && config.headers) {
+      config.headers.Authorization = `Bearer ${token}`;
     }
     return config;
   },
@@ -27,7 +25,6 @@ axiosInstance.interceptors.request.use(
 // Response interceptor for error handling
 axiosInstance.interceptors.response.use(
   (response) => {
-    // Backend doesn't use JWT tokens, so we just return the response
     return response;
   },
   (error) => {
@@ -1,17 +1,24 @@
-import { useEffect, useState, FormEvent } from 'react';
+import { useCallback, useEffect, useRef, useState, FormEvent } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { Item, ItemsResponse, ApiError } from '../types';
 import axiosInstance from '../api/axiosInstance';
 import { AxiosError } from 'axios';
 
+const PAGE_SIZE = 20;
+
 const Browse = () => {
   const navigate = useNavigate();
   const loggedInUserId = localStorage.getItem('user_id');
 
   const [items, setItems] = useState<Item[]>([]);
   const [searchQuery, setSearchQuery] = useState('');
+  // Query the current list was loaded for ('' = the browse feed)
+  const [activeQuery, setActiveQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
+  const sentinelRef = useRef<HTMLDivElement | null>(null);
 
   useEffect(() => {
     if (!loggedInUserId) {
@@ -20,28 +27,33 @@ const Browse = () => {
     }
   }, [loggedInUserId, navigate]);
 
-  const handleSearch = async (e: FormEvent<HTMLFormElement>) => {
-    e.preventDefault();
-    if (!searchQuery.trim() || !loggedInUserId) {
+  // Loads one page of the feed (no query) or of the search results.
+  // Without a cursor the list is replaced, with one the page is appended.
+  const fetchPage = useCallback(async (query: string, cursor: string | null) => {
+    if (!loggedInUserId) {
       return;
     }
 
-    setLoading(true);
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     setError('');
 
     try {
-      const response = await axiosInstance.get<ItemsResponse>('/search', {
-        params: {
-          user_id: loggedInUserId,
-          query: searchQuery.trim(),
-        },
-      });
-
-      if (response.data && response.data.items) {
-        setItems(response.data.items);
-      } else {
-        setItems([]);
+      const params: Record<string, string | number> = { limit: PAGE_SIZE };
+      if (query) {
+        params.query = query;
       }
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const response = await axiosInstance.get<ItemsResponse>(query ? '/search' : '/items', { params });
+
+      const pageItems = response.data?.items ?? [];
+      setItems(prev => (cursor ? [...prev, ...pageItems] : pageItems));
+      setNextCursor(response.data?.next_cursor ?? null);
     } catch (err) {
       console.error('Search error:', err);
       if (err instanceof AxiosError) {
@@ -54,10 +66,46 @@ const Browse = () => {
       } else {
         setError('An unexpected error occurred');
       }
-      setItems([]);
+      if (!cursor) {
+        setItems([]);
+      }
+      setNextCursor(null);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
+  }, [loggedInUserId]);
+
+  // First page of the browse feed on load
+  useEffect(() => {
+    fetchPage('', null);
+  }, [fetchPage]);
+
+  // Infinite scroll: fetch the next page when the sentinel below the grid comes into view
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor) {
+      return;
+    }
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting && !loading && !loadingMore) {
+        fetchPage(activeQuery, nextCursor);
+      }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [activeQuery, nextCursor, loading, loadingMore, fetchPage]);
+
+  const handleSearch = async (e: FormEvent<HTMLFormElement>) => {
+    e.preventDefault();
+    if (!loggedInUserId) {
+      return;
+    }
+
+    // An empty search goes back to the browse feed
+    const query = searchQuery.trim();
+    setActiveQuery(query);
+    await fetchPage(query, null);
   };
 
   const handleLike = async (itemId: string) => {
@@ -243,6 +291,7 @@ const Browse = () => {
                 <p>Try searching for items using the search bar above.</p>
               </div>
             ) : (
+              <>
               <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
                 {items.map((item) => (
                   <div
@@ -305,6 +354,12 @@ const Browse = () => {
                   </div>
                 ))}
               </div>
+              {/* Reaching this loads the next page */}
+              <div ref={sentinelRef} className="h-1" />
+              {loadingMore && (
+                <div className="text-gray-600 text-center py-6">Loading more...</div>
+              )}
+              </>
             )}
           </div>
         </div>
@@ -42,6 +42,7 @@ const LoginSignup = () => {
       if (response.data && response.data.user_id) {
         localStorage.setItem('user', JSON.stringify(response.data));
         localStorage.setItem('user_id', response.data.user_id);
+        localStorage.setItem('token', response.data.token);
         console.log('Redirecting to profile:', `/profile/${response.data.user_id}`);
         navigate(`/profile/${response.data.user_id}`);
       } else {
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { apiService } from '../api/apiService';
-import { Item } from '../types';
+import { DashboardResponse, Item } from '../types';
 import { useNavigate } from 'react-router-dom';
 
 interface User {
@@ -11,10 +11,16 @@ interface User {
   };
 }
 
+// as many items per section as the backend hands out (MAX_LIMIT in pagination.py),
+// anything past that is shown as "N more"
+const DASHBOARD_PAGE_LIMIT = 100;
+
 const Matches: React.FC = () => {
   const navigate = useNavigate();
   const [activeRequests, setActiveRequests] = useState<Item[]>([]);
   const [loanedItems, setLoanedItems] = useState<Item[]>([]);
+  const [activeCount, setActiveCount] = useState(0);
+  const [loanedCount, setLoanedCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [users, setUsers] = useState<{ [key: string]: User }>({});
@@ -39,18 +45,16 @@ const Matches: React.FC = () => {
       try {
         setLoading(true);
         
-        // Fetch both data types in parallel
-        const [requestsResponse, loanedResponse] = await Promise.all([
-          apiService.getActiveRequests(userId),
-          apiService.getMyLoanedItems(userId)
-        ]);
+        // Requests + loaned items in one call (one query on the backend)
+        const dashboard: DashboardResponse = await apiService.getDashboard(DASHBOARD_PAGE_LIMIT);
 
-        // Extract items from responses
-        const requests = requestsResponse.items || [];
-        const loaned = loanedResponse.items || [];
+        const requests = dashboard.borrowing.active.items;
+        const loaned = dashboard.lending.loaned.items;
 
         setActiveRequests(requests);
         setLoanedItems(loaned);
+        setActiveCount(dashboard.borrowing.active.count);
+        setLoanedCount(dashboard.lending.loaned.count);
 
         // Collect all user IDs we need to fetch
         const userIds = new Set<string>();
@@ -126,6 +130,11 @@ const Matches: React.FC = () => {
     );
   };
 
+  const MoreNote = ({ shown, total }: { shown: number; total: number }) =>
+    total > shown ? (
+      <p className="text-center text-sm text-gray-500">{total - shown} more not shown</p>
+    ) : null;
+
   const RequestCard = ({ item, showRating = false }: { item: Item; showRating?: boolean }) => {
     const owner = users[item.user_id];
     const requester = users[item.requester || ''];
@@ -290,9 +299,12 @@ const Matches: React.FC = () => {
               </h2>
               <div className="space-y-4">
                 {activeRequests.length > 0 ? (
-                  activeRequests.map((item) => (
-                    <RequestCard key={item._id} item={item} showRating={true} />
-                  ))
+                  <>
+                    {activeRequests.map((item) => (
+                      <RequestCard key={item._id} item={item} showRating={true} />
+                    ))}
+                    <MoreNote shown={activeRequests.length} total={activeCount} />
+                  </>
                 ) : (
                   <div className="bg-gradient-to-r from-purple-50 to-pink-50 rounded-xl p-8 text-center text-gray-500 border border-purple-200">
                     <div className="text-6xl mb-4">📚</div>
@@ -310,9 +322,12 @@ const Matches: React.FC = () => {
               </h2>
               <div className="space-y-4">
                 {loanedItems.length > 0 ? (
-                  loanedItems.map((item) => (
-                    <RequestCard key={item._id} item={item} showRating={false} />
-                  ))
+                  <>
+                    {loanedItems.map((item) => (
+                      <RequestCard key={item._id} item={item} showRating={false} />
+                    ))}
+                    <MoreNote shown={loanedItems.length} total={loanedCount} />
+                  </>
                 ) : (
                   <div className="bg-gradient-to-r from-purple-50 to-pink-50 rounded-xl p-8 text-center text-gray-500 border border-purple-200">
                     <div className="text-6xl mb-4">📦</div>
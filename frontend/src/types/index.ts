@@ -6,6 +6,8 @@ export interface UserProfile {
   program: string;
   '#ofratings': number;
   rating: number;
+  // Bayesian average the search ranking uses (absent until the first rating)
+  rating_score?: number;
 }
 
 export interface PossibleDateSlot {
@@ -32,6 +34,8 @@ export interface LoginResponse {
   email: string;
   profile: UserProfile;
   possible_dates: PossibleDateSlot[];
+  // Signed session token, sent back as "Authorization: Bearer <token>"
+  token: string;
 }
 
 export interface SignupRequest {
@@ -55,13 +59,21 @@ export interface ApiError {
 // Item-related types based on backend/item/models.py
 
 export type ItemCondition = 'excellent' | 'gently used' | 'fair' | 'poor';
-export type ItemStatus = 'available' | 'unavailable' | 'old';
+// 'overdue' = past return_date and not rated yet (set by the backend scheduler)
+export type ItemStatus = 'available' | 'unavailable' | 'overdue' | 'old';
 
 export interface ItemOwner {
   username: string;
   profile: UserProfile;
 }
 
+export interface ImageVariants {
+  original: string;
+  thumb: string;
+  card: string;
+  full: string;
+}
+
 export interface Item {
   _id: string;
   user_id: string;
@@ -73,6 +85,8 @@ export interface Item {
   program?: string;
   school: string;
   images: string[];
+  // Resized versions of each image in `images` (same order)
+  image_variants?: ImageVariants[];
   return_date: string; // ISO date string
   status: ItemStatus;
   owner?: ItemOwner;
@@ -81,6 +95,8 @@ export interface Item {
 
 export interface ItemsResponse {
   items: Item[];
+  // Opaque token for the next page, null/absent on the last page
+  next_cursor?: string | null;
 }
 
 export interface CreateItemRequest {
@@ -92,6 +108,24 @@ export interface CreateItemRequest {
   images?: File[];
 }
 
+export interface DashboardSection {
+  count: number;
+  items: Item[]; // at most `limit` of them
+}
+
+export interface DashboardResponse {
+  borrowing: {
+    active: DashboardSection;
+    needs_rating: DashboardSection;
+    history: DashboardSection;
+  };
+  lending: {
+    loaned: DashboardSection;
+    overdue: DashboardSection;
+    available: DashboardSection;
+  };
+}
+
 export interface UserActivityResponse {
   active: Item[];
   needs_rating: Item[];